@@ -7,7 +7,44 @@ from .base.move import MoveSet
 from .base.piece import Piece, PieceType
 from .game.janggi_game import JanggiGame
 from .game.game_log import GameLog
-from .ui.game_window import GameWindow
-from .ui.replay_viewer import ReplayViewer
+from .game.action_space import ACTION_SPACE_SIZE, encode_action, decode_action
 from .proto import log_pb2
-from .utils import generate_random_game, play, replay
\ No newline at end of file
+from .utils import generate_random_game, play, replay
+
+# The UI needs pygame and the engines are slow to load, so they are only imported
+# on first access.
+_LAZY_ATTRIBUTES = {
+    "GameWindow": ".ui.game_window",
+    "ReplayViewer": ".ui.replay_viewer",
+    "BatchJanggiEnv": ".game.batch_env",
+    "TranspositionTable": ".engine.transposition_table",
+    "AlphaBetaSearch": ".engine.search",
+    "SearchResult": ".engine.search",
+    "MCTS": ".engine.mcts",
+    "MCTSResult": ".engine.mcts",
+    "OpeningBook": ".engine.opening_book",
+    "OpeningBookBuilder": ".engine.opening_book",
+    "Tablebase": ".engine.tablebase",
+    "TablebaseGenerator": ".engine.tablebase",
+    "SelfPlay": ".selfplay",
+    "SelfPlayStats": ".selfplay",
+    "FeaturePipeline": ".features",
+    "FeatureBatch": ".features",
+}
+
+# Star imports still load the engines; the UI has to be imported by name.
+__all__ = [name for name in globals() if not name.startswith("_")] + [
+    name for name, module in _LAZY_ATTRIBUTES.items() if not module.startswith(".ui.")]
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        import importlib
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
@@ -1,25 +1,63 @@
 from __future__ import annotations
-import numpy as np
+from array import array
 from typing import List, Optional
 
-from ..constants import MIN_ROW, MAX_ROW, MIN_COL, MAX_COL, NUM_ROWS, NUM_COLS
-from .piece import Piece, PieceType
+import numpy as np
+
+from ..constants import MAX_ROW, MAX_COL, NUM_COLS, NUM_SQUARES
+from .piece import Piece, PieceType, PIECE_VALUE, MAX_CODE
 from .camp import Camp
 from .formation import Formation
 from .location import Location
+from .move_table import is_square_attacked
+from .planes import empty_planes, encode_board_planes
+from .zobrist import PIECE_KEYS, TURN_KEY, compute_key
+
+# Piece value for every signed piece code, indexed by (code + MAX_CODE).
+_VALUE_BY_CODE = [0] * (2 * MAX_CODE + 1)
+for _piece_type, _value in PIECE_VALUE.items():
+    _VALUE_BY_CODE[MAX_CODE + _piece_type.value] = _value
+    _VALUE_BY_CODE[MAX_CODE - _piece_type.value] = _value
+
+# Piece codes of camp han, of every camp and of camp cho, indexed by (camp + 1).
+_CODES_BY_CAMP = [
+    [-piece_type.value for piece_type in PieceType],
+    [sign * piece_type.value for piece_type in PieceType for sign in (1, -1)],
+    [piece_type.value for piece_type in PieceType],
+]
 
 
 class Board:
     """
-    Simple board class used for the game of Janggi. Contains and handles a single 
-    10x9 two-dimensional list that contains either a Piece object or None.
+    Simple board class used for the game of Janggi. Contains and handles a single
+    flat 90-cell int8 array (array.array of typecode "b"), where the cell at (row,col) is stored at index
+    row * NUM_COLS + col. Each cell holds the signed code of a piece (see Piece.code),
+    positive for camp cho and negative for camp han, or 0 if the cell is empty.
+    A Zobrist key of the pieces is maintained incrementally as the cells change,
+    along with the squares of every piece code and the material of each camp,
+    so pieces are listed in O(pieces) and scores are read in O(1).
     """
 
     def __init__(self, cho_formation: Formation, han_formation: Formation, bottom_camp: Camp):
         self.cho_formation = cho_formation
         self.han_formation = han_formation
         self.bottom_camp = bottom_camp
-        self.__board = np.full((NUM_ROWS, NUM_COLS), None)
+        self.__board = array("b", bytes(NUM_SQUARES))
+        self.__key = 0
+        # __squares[code + MAX_CODE]: squares of the pieces with the code, in no order
+        self.__squares = [[] for _ in range(2 * MAX_CODE + 1)]
+        # __material[camp + 1]: total piece value of the camp (see get_score)
+        self.__material = [0, 0, 0]
+
+    def __eq__(self, other) -> bool:
+        """Return True if both boards have the same pieces on the same cells."""
+        if not isinstance(other, Board):
+            return NotImplemented
+        return self.__key == other.__key and self.__board == other.__board
+
+    def __hash__(self) -> int:
+        """Return the Zobrist key of the pieces on the board."""
+        return self.__key
 
     def __str__(self) -> str:
         """Generate colored and structured string representation of the board."""
@@ -31,8 +69,8 @@ class Board:
                 elif row >= 0 and col == -1:
                     print_str += " " + str(row % 10)
                 elif row >= 0 and col >= 0:
-                    if self.__board[row][col]:
-                        print_str += str(self.__board[row][col])
+                    if self.get(row, col):
+                        print_str += str(self.get(row, col))
                     else:
                         print_str += "  "
                 else:
@@ -77,21 +115,81 @@ class Board:
         """
         copied_board = Board(self.cho_formation,
                              self.han_formation, self.bottom_camp)
-        copied_board.__board = self.__board.copy()
+        copied_board.__board = self.__board[:]
+        copied_board.__key = self.__key
+        copied_board.__squares = [squares[:] for squares in self.__squares]
+        copied_board.__material = self.__material[:]
         return copied_board
 
+    def position_key(self, turn: Camp = Camp.CHO) -> int:
+        """
+        Return the 64-bit Zobrist key of the position. The key covers the piece and
+        camp on every cell plus the side to move, and is updated in O(1) per change.
+
+        Args:
+            turn (Camp): Camp whose turn it is in the position.
+
+        Returns:
+            int: 64-bit position key.
+        """
+        if turn == Camp.HAN:
+            return self.__key ^ TURN_KEY
+        return self.__key
+
+    @property
+    def cells(self) -> array:
+        """
+        Return the flat int8 array that backs the board.
+        The array is shared with the board and must not be modified directly.
+        Use np.frombuffer(board.cells, dtype=np.int8) for a zero-copy NumPy view.
+
+        Returns:
+            array: Array of 90 signed piece codes indexed by row * NUM_COLS + col.
+        """
+        return self.__board
+
+    def to_planes(self, camp: Optional[Camp] = None, out: Optional[np.ndarray] = None,
+                  dtype=np.float32) -> np.ndarray:
+        """
+        Encode the board into one-hot piece planes (see planes.NUM_PIECE_PLANES).
+        Planes 0-6 hold the pieces of the given camp and planes 7-13 the opponent's,
+        one plane per PieceType. The board is seen from the given camp's side: it is
+        rotated by 180 degrees if the camp is not the bottom camp.
+
+        Args:
+            camp (Optional[Camp]): Camp to encode the board for; defaults to the bottom camp.
+            out (Optional[np.ndarray]): Array of shape (14, NUM_ROWS, NUM_COLS)
+              to write to, so that no new array is allocated.
+            dtype: Data type of the new array if out is not given.
+
+        Returns:
+            np.ndarray: Array of shape (14, NUM_ROWS, NUM_COLS).
+        """
+        camp = camp if camp is not None else self.bottom_camp
+        if out is None:
+            out = empty_planes(dtype=dtype)
+        cells = np.frombuffer(self.__board, dtype=np.int8)
+        return encode_board_planes(cells, int(camp), camp != self.bottom_camp, out)
+
     def put(self, row: int, col: int, piece: Piece):
         """
         Put piece into board at the given (row,col) location.
         Used row and col as inputs instead of Location to make it easier to generate
         initial boards in formation.py.
+        Pieces without a camp are stored as camp cho until Board.mark_camp is called.
 
         Args:
             row (int): Row that the given piece that will placed on.
             col (int): Column that the given piece that will be placed on.
             piece (Piece): Piece that will be placed on the board.
         """
-        self.__board[row][col] = piece
+        index = row * NUM_COLS + col
+        code = piece.code
+        self.__key ^= (PIECE_KEYS[self.__board[index] + MAX_CODE][index] ^
+                       PIECE_KEYS[code + MAX_CODE][index])
+        self._remove_from_index(self.__board[index], index)
+        self._add_to_index(code, index)
+        self.__board[index] = code
 
     def merge(self, board: Board):
         """
@@ -100,10 +198,11 @@ class Board:
         Args:
             board (Board): Input board that will be merged into self.__board.
         """
-        for row in range(MIN_ROW, MAX_ROW+1):
-            for col in range(MIN_COL, MAX_COL+1):
-                if board.get(row, col):
-                    self.__board[row][col] = board.get(row, col)
+        for index, code in enumerate(board.__board):
+            if code:
+                self.__board[index] = code
+        self.__key = compute_key(self.__board)
+        self._rebuild_index()
 
     def get(self, row: int, col: int) -> Piece:
         """
@@ -116,7 +215,7 @@ class Board:
         Returns:
             Piece: Piece located at (row,col) on the board. Can be None.
         """
-        return self.__board[row][col]
+        return Piece.from_code(self.__board[row * NUM_COLS + col])
 
     def remove(self, row: int, col: int):
         """
@@ -126,7 +225,10 @@ class Board:
             row (int): Row of the piece to be removed.
             col (int): Column of the piece to be removed.
         """
-        self.__board[row][col] = None
+        index = row * NUM_COLS + col
+        self.__key ^= PIECE_KEYS[self.__board[index] + MAX_CODE][index]
+        self._remove_from_index(self.__board[index], index)
+        self.__board[index] = 0
 
     def move(self, origin: Location, dest: Location) -> Optional[Piece]:
         """
@@ -137,16 +239,73 @@ class Board:
             origin (Location): Original location of the piece being played.
             dest (Location): Destination of the piece being played.
         """
-        assert self.get(origin.row, origin.col) is not None
-        piece_to_remove = self.get(dest.row, dest.col)
-        piece = self.get(origin.row, origin.col)
-        self.put(dest.row, dest.col, piece)
-        self.remove(origin.row, origin.col)
-        return piece_to_remove
+        captured_code = self.move_square(origin.index, dest.index)
+        return Piece.from_code(captured_code)
+
+    def undo_move(self, origin: Location, dest: Location, captured: Optional[Piece]):
+        """
+        Revert Board.move by moving the piece at dest back to origin and putting
+        back the piece that was captured at dest.
+
+        Args:
+            origin (Location): Original location of the piece that was played.
+            dest (Location): Destination of the piece that was played.
+            captured (Optional[Piece]): Piece returned by Board.move. Can be None.
+        """
+        self.undo_move_square(origin.index, dest.index,
+                              captured.code if captured else 0)
+
+    def move_square(self, origin_square: int, dest_square: int) -> int:
+        """
+        Same as Board.move, but with square indices (row * NUM_COLS + col) and piece codes.
+
+        Args:
+            origin_square (int): Original square of the piece being played.
+            dest_square (int): Destination square of the piece being played.
+
+        Returns:
+            int: Code of the piece that was originally placed at dest_square (0 if none).
+        """
+        code = self.__board[origin_square]
+        captured_code = self.__board[dest_square]
+        assert code != 0
+        self.__key ^= (PIECE_KEYS[code + MAX_CODE][origin_square] ^
+                       PIECE_KEYS[captured_code + MAX_CODE][dest_square] ^
+                       PIECE_KEYS[code + MAX_CODE][dest_square])
+        self.__board[dest_square] = code
+        self.__board[origin_square] = 0
+        squares = self.__squares[code + MAX_CODE]
+        squares[squares.index(origin_square)] = dest_square
+        if captured_code:
+            self._remove_from_index(captured_code, dest_square)
+        return captured_code
+
+    def undo_move_square(self, origin_square: int, dest_square: int, captured_code: int):
+        """
+        Same as Board.undo_move, but with square indices and piece codes.
+
+        Args:
+            origin_square (int): Original square of the piece that was played.
+            dest_square (int): Destination square of the piece that was played.
+            captured_code (int): Code returned by Board.move_square.
+        """
+        code = self.__board[dest_square]
+        assert code != 0
+        self.__key ^= (PIECE_KEYS[code + MAX_CODE][dest_square] ^
+                       PIECE_KEYS[captured_code + MAX_CODE][dest_square] ^
+                       PIECE_KEYS[code + MAX_CODE][origin_square])
+        self.__board[origin_square] = code
+        self.__board[dest_square] = captured_code
+        squares = self.__squares[code + MAX_CODE]
+        squares[squares.index(dest_square)] = origin_square
+        if captured_code:
+            self._add_to_index(captured_code, dest_square)
 
     def flip(self):
         """Rotate the board 180 degrees and update self.__board."""
-        self.__board = np.flip(self.__board)
+        self.__board.reverse()
+        self.__key = compute_key(self.__board)
+        self._rebuild_index()
 
     def mark_camp(self, camp: Camp):
         """
@@ -156,10 +315,11 @@ class Board:
         Args:
             camp (Camp): Camp enum to mark pieces with.
         """
-        for row in range(MIN_ROW, MAX_ROW+1):
-            for col in range(MIN_COL, MAX_COL+1):
-                if self.__board[row][col]:
-                    self.__board[row][col].camp = camp
+        for index, code in enumerate(self.__board):
+            if code:
+                self.__board[index] = abs(code) * camp
+        self.__key = compute_key(self.__board)
+        self._rebuild_index()
 
     def get_score(self, camp: Camp) -> int:
         """
@@ -171,12 +331,75 @@ class Board:
         Returns:
             int: Score of the player who's playing the given camp.
         """
-        score = 0
-        for row in range(MIN_ROW, MAX_ROW+1):
-            for col in range(MIN_COL, MAX_COL+1):
-                if self.__board[row][col] and self.__board[row][col].camp == camp:
-                    score += self.__board[row][col].value
-        return score
+        return self.__material[camp + 1]
+
+    def get_general_location(self, camp: Camp) -> Optional[Location]:
+        """
+        Get location of the general of the given camp.
+
+        Args:
+            camp (Camp): Camp of the general.
+
+        Returns:
+            Optional[Location]: Location of the general, or None if it has been captured.
+        """
+        square = self.get_general_square(camp)
+        return Location.from_index(square) if square >= 0 else None
+
+    def is_attacked(self, location: Location, camp: Camp) -> bool:
+        """
+        Check if any piece of the given camp can move to the given location.
+
+        Args:
+            location (Location): Location to check.
+            camp (Camp): Camp of the attacking pieces.
+
+        Returns:
+            bool: True if the location is attacked by the camp; False otherwise.
+        """
+        return is_square_attacked(self.__board, location.index, camp, camp == self.bottom_camp)
+
+    def get_general_square(self, camp: Camp) -> int:
+        """
+        Get square index (row * NUM_COLS + col) of the general of the given camp.
+
+        Args:
+            camp (Camp): Camp of the general.
+
+        Returns:
+            int: Square index of the general, or -1 if it has been captured.
+        """
+        squares = self.__squares[PieceType.GENERAL.value * camp + MAX_CODE]
+        return squares[0] if squares else -1
+
+    def get_piece_squares(self, camp: Optional[Camp] = None) -> List[int]:
+        """
+        Get square indices (row * NUM_COLS + col) of the pieces with the given camp.
+
+        Args:
+            camp (Optional[Camp]): Camp of the pieces to fetch; all pieces if None.
+
+        Returns:
+            List[int]: New list of the squares in row-major order.
+        """
+        squares = []
+        for code in _CODES_BY_CAMP[camp + 1 if camp is not None else 1]:
+            squares += self.__squares[code + MAX_CODE]
+        squares.sort()
+        return squares
+
+    def get_piece_type_squares(self, piece_type: PieceType, camp: Camp) -> List[int]:
+        """
+        Get square indices (row * NUM_COLS + col) of the pieces with the given type and camp.
+
+        Args:
+            piece_type (PieceType): Type of the pieces to fetch.
+            camp (Camp): Camp of the pieces to fetch.
+
+        Returns:
+            List[int]: New list of the squares in row-major order.
+        """
+        return sorted(self.__squares[piece_type.value * camp + MAX_CODE])
 
     def get_piece_locations(self) -> List[Location]:
         """
@@ -185,12 +408,7 @@ class Board:
         Returns:
             List[Location]: List of all locations of the pieces on the board.
         """
-        piece_locations = []
-        for row in range(MIN_ROW, MAX_ROW+1):
-            for col in range(MIN_COL, MAX_COL+1):
-                if self.__board[row][col]:
-                    piece_locations.append(Location(row, col))
-        return piece_locations
+        return [Location.from_index(index) for index in self.get_piece_squares()]
 
     def get_piece_locations_for_camp(self, camp: Camp) -> List[Location]:
         """
@@ -202,12 +420,24 @@ class Board:
         Returns:
             List[Location]: List of all locations of the pieces with the given camp.
         """
-        piece_locations = []
-        for row in range(MIN_ROW, MAX_ROW+1):
-            for col in range(MIN_COL, MAX_COL+1):
-                if self.__board[row][col] and self.__board[row][col].camp == camp:
-                    piece_locations.append(Location(row, col))
-        return piece_locations
+        return [Location.from_index(index) for index in self.get_piece_squares(camp)]
+
+    def _add_to_index(self, code: int, index: int):
+        if code:
+            self.__squares[code + MAX_CODE].append(index)
+            self.__material[(1 if code > 0 else -1) + 1] += _VALUE_BY_CODE[code + MAX_CODE]
+
+    def _remove_from_index(self, code: int, index: int):
+        if code:
+            self.__squares[code + MAX_CODE].remove(index)
+            self.__material[(1 if code > 0 else -1) + 1] -= _VALUE_BY_CODE[code + MAX_CODE]
+
+    def _rebuild_index(self):
+        """Recompute piece squares and material after the cells change all at once."""
+        self.__squares = [[] for _ in range(2 * MAX_CODE + 1)]
+        self.__material = [0, 0, 0]
+        for index, code in enumerate(self.__board):
+            self._add_to_index(code, index)
 
     @classmethod
     def _generate_half_board(cls, formation: Formation) -> Board:
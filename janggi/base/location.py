@@ -1,17 +1,20 @@
 from __future__ import annotations
 from typing import Iterable
-from ..constants import MIN_ROW, MAX_ROW, MIN_COL, MAX_COL
+from ..constants import MIN_ROW, MAX_ROW, MIN_COL, MAX_COL, NUM_COLS, NUM_SQUARES
 from ..proto import log_pb2
 
 
 class Location:
     """
     Location class that each represents a single location on the board grid.
+    Locations are immutable and interned: there is exactly one instance per square,
+    so locations compare and hash by identity and constructing one is a table lookup.
     """
+    __slots__ = ("row", "col", "index")
 
-    def __init__(self, row: int, col: int):
+    def __new__(cls, row: int, col: int) -> Location:
         """
-        Initialize location.
+        Return the location at (row, col).
 
         Args:
             row (int): row number in range 0 <= row <= 9.
@@ -21,32 +24,78 @@ class Location:
             Exception: row is out of range.
             Exception: column is out of range.
         """
-        self.row = row
-        self.col = col
+        return cls.at(row, col)
 
-        if self.row < MIN_ROW or self.row > MAX_ROW:
-            raise Exception(f"location row is out of range: {self.row}")
+    @staticmethod
+    def at(row: int, col: int) -> Location:
+        """
+        Return the location at (row, col), same as Location(row, col).
+
+        Args:
+            row (int): row number in range 0 <= row <= 9.
+            col (int): column number in range 0 <= col <= 8.
+
+        Raises:
+            Exception: row is out of range.
+            Exception: column is out of range.
+
+        Returns:
+            Location: The shared instance of the location.
+        """
+        if row < MIN_ROW or row > MAX_ROW:
+            raise Exception(f"location row is out of range: {row}")
+        if col < MIN_COL or col > MAX_COL:
+            raise Exception(f"location column is out of range: {col}")
+        return _LOCATIONS[row * NUM_COLS + col]
+
+    @staticmethod
+    def from_index(index: int) -> Location:
+        """
+        Return the location of a square index.
 
-        if self.col < MIN_COL or self.col > MAX_COL:
-            raise Exception(f"location column is out of range: {self.col}")
+        Args:
+            index (int): Square index (row * NUM_COLS + col) in range 0 <= index < 90.
+
+        Raises:
+            Exception: index is out of range.
+
+        Returns:
+            Location: The shared instance of the location.
+        """
+        if index < 0 or index >= NUM_SQUARES:
+            raise Exception(f"location index is out of range: {index}")
+        return _LOCATIONS[index]
+
+    def __setattr__(self, name: str, value):
+        raise Exception("Location is immutable.")
+
+    def __delattr__(self, name: str):
+        raise Exception("Location is immutable.")
+
+    def __reduce__(self):
+        """Unpickle and copy into the shared instance instead of a new one."""
+        return Location.from_index, (self.index,)
 
     def __str__(self) -> str:
         """Return string representation of location."""
         return f"({self.row},{self.col})"
 
+    def __repr__(self) -> str:
+        return f"Location({self.row}, {self.col})"
+
     def __iter__(self) -> Iterable:
         """Make location iterable so that it can easily be converted into a tuple or list."""
         yield self.row
         yield self.col
 
-    def __eq__(self, other) -> bool:
-        """Return True if two location classes have same row and col; False otherwise."""
-        return self.row == other.row and self.col == other.col
+    def __hash__(self) -> int:
+        """Return the square index, so that hashing is deterministic across processes."""
+        return self.index
 
     @classmethod
     def from_proto(cls, location_proto: log_pb2.Location) -> Location:
         """Convert from proto Location message."""
-        return Location(location_proto.row, location_proto.col)
+        return cls.at(location_proto.row, location_proto.col)
 
     def to_proto(self) -> log_pb2.Location:
         """Convert to proto Location message."""
@@ -54,3 +103,17 @@ class Location:
         location_proto.row = self.row
         location_proto.col = self.col
         return location_proto
+
+
+def _build_locations():
+    locations = []
+    for index in range(NUM_SQUARES):
+        location = object.__new__(Location)
+        for name, value in zip(Location.__slots__, (*divmod(index, NUM_COLS), index)):
+            object.__setattr__(location, name, value)
+        locations.append(location)
+    return tuple(locations)
+
+
+# _LOCATIONS[index]: the only Location instance of every square index.
+_LOCATIONS = _build_locations()
@@ -1,6 +1,6 @@
 from typing import List, Tuple
 
-from ..constants import MIN_ROW, MAX_ROW, MIN_COL, MAX_COL
+from ..constants import MIN_ROW, MAX_ROW, MIN_COL, MAX_COL, NUM_COLS
 from .location import Location
 from .camp import Camp
 from .piece import PieceType
@@ -39,7 +39,7 @@ class MoveSet:
             for dr, dc in self.moves:
                 row += dr
                 col += dc
-            return Location(row, col)
+            return Location.at(row, col)
         else:
             return None
 
@@ -58,8 +58,10 @@ class MoveSet:
         def _is_out_of_bound(row: int, col: int):
             return (row < MIN_ROW or row > MAX_ROW or
                     col < MIN_COL or col > MAX_COL)
-        origin_piece = board.get(origin.row, origin.col)
-        num_hurdles = 1 if origin_piece.piece_type == PieceType.CANNON else 0
+        cells = board.cells
+        origin_code = cells[origin.index]
+        is_cannon = abs(origin_code) == PieceType.CANNON.value
+        num_hurdles = 1 if is_cannon else 0
         row, col = (origin.row, origin.col)
         for i in range(len(self.moves)):
             (dr, dc) = self.moves[i]
@@ -68,24 +70,23 @@ class MoveSet:
             if _is_out_of_bound(row, col):
                 return False
 
-            piece = board.get(row, col)
+            code = cells[row * NUM_COLS + col]
 
             if i == len(self.moves)-1:
                 # invalidate if landing on an ally piece
-                if piece and piece.camp == player:
+                if code * player > 0:
                     return False
                 # invalidate if some hurdles are left for a cannon
-                if origin_piece.piece_type == PieceType.CANNON and num_hurdles > 0:
+                if is_cannon and num_hurdles > 0:
                     return False
                 # invalidate if cannon is landing on another cannon
-                if (origin_piece.piece_type == PieceType.CANNON and
-                        (piece and piece.piece_type == PieceType.CANNON)):
+                if is_cannon and abs(code) == PieceType.CANNON.value:
                     return False
 
-            elif piece:
-                if origin_piece.piece_type == PieceType.CANNON:
+            elif code:
+                if is_cannon:
                     # cannon cannot ever pass cannon
-                    if piece.piece_type == PieceType.CANNON:
+                    if abs(code) == PieceType.CANNON.value:
                         return False
                     # decrement number of hurdles left when passing a piece
                     num_hurdles -= 1
@@ -0,0 +1,352 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from ..constants import MIN_ROW, MAX_ROW, MIN_COL, MAX_COL, NUM_COLS, NUM_SQUARES
+from .camp import Camp
+from .location import Location
+from .move import MoveSet
+from .piece import Piece, PieceType
+
+# A move path is (path, dest): the squares a piece passes through, in order,
+# followed by the square it lands on. Squares are indices row * NUM_COLS + col.
+MovePath = Tuple[Tuple[int, ...], int]
+
+# Directions of the rays in STRAIGHT_RAYS, in the order Piece.get_straight_move_sets uses.
+STRAIGHT_DIRECTIONS = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+
+
+def _is_out_of_bound(row: int, col: int) -> bool:
+    return (row < MIN_ROW or row > MAX_ROW or
+            col < MIN_COL or col > MAX_COL)
+
+
+def _generate_move_sets(piece: Piece, origin: Location, is_player: bool) -> List[MoveSet]:
+    """
+    Generate move sets of a piece at origin, the same way JanggiGame used to on every call.
+
+    Args:
+        piece (Piece): Piece to generate move sets for.
+        origin (Location): Location of the piece.
+        is_player (bool): True if the piece belongs to the main (bottom) player; False otherwise.
+
+    Returns:
+        List[MoveSet]: All move sets the piece can make regardless of validity.
+    """
+    if piece.piece_type == PieceType.SOLDIER:
+        return piece.get_soldier_move_sets(origin, is_player)
+    elif piece.piece_type == PieceType.HORSE or piece.piece_type == PieceType.ELEPHANT:
+        return piece.get_jumpy_move_sets()
+    elif piece.piece_type == PieceType.CHARIOT or piece.piece_type == PieceType.CANNON:
+        return piece.get_straight_move_sets(origin)
+    else:
+        return piece.get_castle_move_sets(origin, is_player)
+
+
+def _to_move_path(move_set: MoveSet, origin: Location) -> MovePath:
+    """Convert a move set into squares, or None if it leaves the board."""
+    row, col = (origin.row, origin.col)
+    squares = []
+    for dr, dc in move_set.moves:
+        row += dr
+        col += dc
+        if _is_out_of_bound(row, col):
+            return None
+        squares.append(row * NUM_COLS + col)
+    return tuple(squares[:-1]), squares[-1]
+
+
+def _build_tables():
+    move_sets = {}
+    move_paths = {}
+    for piece_type in PieceType:
+        piece = Piece(piece_type)
+        piece.camp = Camp.CHO
+        for is_player in (True, False):
+            sets_per_square = []
+            paths_per_square = []
+            for square in range(NUM_SQUARES):
+                origin = Location.from_index(square)
+                sets = []
+                paths = []
+                for move_set in _generate_move_sets(piece, origin, is_player):
+                    move_path = _to_move_path(move_set, origin)
+                    if move_path is None:
+                        continue
+                    sets.append(move_set)
+                    paths.append(move_path)
+                sets_per_square.append(tuple(sets))
+                paths_per_square.append(tuple(paths))
+            move_sets[(piece_type, is_player)] = sets_per_square
+            move_paths[(piece_type, is_player)] = paths_per_square
+    return move_sets, move_paths
+
+
+def _build_straight_rays() -> List[Tuple[Tuple[int, ...], ...]]:
+    rays = []
+    for square in range(NUM_SQUARES):
+        origin_row, origin_col = divmod(square, NUM_COLS)
+        square_rays = []
+        for dr, dc in STRAIGHT_DIRECTIONS:
+            row, col = (origin_row + dr, origin_col + dc)
+            ray = []
+            while not _is_out_of_bound(row, col):
+                ray.append(row * NUM_COLS + col)
+                row += dr
+                col += dc
+            square_rays.append(tuple(ray))
+        rays.append(tuple(square_rays))
+    return rays
+
+
+# STRAIGHT_RAYS[square]: squares reachable in each of STRAIGHT_DIRECTIONS, nearest first.
+STRAIGHT_RAYS = _build_straight_rays()
+
+
+def _build_straight_castle_paths(move_paths) -> List[Tuple[MovePath, ...]]:
+    # Piece.get_straight_move_sets lists every ray square before the castle moves.
+    castle_paths = []
+    for square, paths in enumerate(move_paths[(PieceType.CHARIOT, True)]):
+        num_ray_squares = sum(len(ray) for ray in STRAIGHT_RAYS[square])
+        castle_paths.append(paths[num_ray_squares:])
+    return castle_paths
+
+
+def _build_reverse_paths(move_paths, straight_castle_paths) -> Dict[Tuple[PieceType, bool], List[Tuple[Tuple[int, Tuple[int, ...]], ...]]]:
+    reverse_paths = {}
+    for (piece_type, is_player), paths_per_square in move_paths.items():
+        if piece_type == PieceType.CHARIOT or piece_type == PieceType.CANNON:
+            # straight rays are symmetric, so only the castle moves need reversing
+            paths_per_square = straight_castle_paths
+        reverse = [[] for _ in range(NUM_SQUARES)]
+        for origin, paths in enumerate(paths_per_square):
+            for path, dest in paths:
+                if (origin, path) not in reverse[dest]:
+                    reverse[dest].append((origin, path))
+        reverse_paths[(piece_type, is_player)] = [tuple(entries) for entries in reverse]
+    return reverse_paths
+
+
+class _Tables(NamedTuple):
+    """
+    Move tables generated from Piece on first use rather than on import.
+
+    Attributes:
+        move_sets: MOVE_SETS[(piece_type, is_player)][square]: in-bound move sets of a
+          piece on the square.
+        move_paths: MOVE_PATHS[(piece_type, is_player)][square]: the same moves as
+          MovePath tuples. Horse and elephant paths hold the leg squares that block them,
+          castle pieces' paths hold the palace adjacency (including diagonals) of the square.
+        straight_castle_paths: STRAIGHT_CASTLE_PATHS[square]: moves chariots and cannons
+          have in the castle on top of STRAIGHT_RAYS. They are the same for both camps.
+        reverse_paths: REVERSE_PATHS[(piece_type, is_player)][target]: (origin, path) of
+          every move that lands on the target square. Used to find attackers from the
+          target outward.
+    """
+    move_sets: Dict[Tuple[PieceType, bool], List[Tuple[MoveSet, ...]]]
+    move_paths: Dict[Tuple[PieceType, bool], List[Tuple[MovePath, ...]]]
+    straight_castle_paths: List[Tuple[MovePath, ...]]
+    reverse_paths: Dict[Tuple[PieceType, bool], List[Tuple[Tuple[int, Tuple[int, ...]], ...]]]
+
+
+_tables: Optional[_Tables] = None
+
+
+def _load_tables() -> _Tables:
+    global _tables
+    if _tables is None:
+        move_sets, move_paths = _build_tables()
+        straight_castle_paths = _build_straight_castle_paths(move_paths)
+        reverse_paths = _build_reverse_paths(move_paths, straight_castle_paths)
+        _tables = _Tables(move_sets, move_paths, straight_castle_paths, reverse_paths)
+    return _tables
+
+
+# Module attributes served from the lazily built tables.
+_LAZY_TABLES = {
+    "MOVE_SETS": "move_sets",
+    "MOVE_PATHS": "move_paths",
+    "STRAIGHT_CASTLE_PATHS": "straight_castle_paths",
+    "REVERSE_PATHS": "reverse_paths",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_TABLES:
+        return getattr(_load_tables(), _LAZY_TABLES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_move_sets(piece_type: PieceType, square: int, is_player: bool) -> Tuple[MoveSet, ...]:
+    """
+    Look up all in-bound move sets a piece can make regardless of validity.
+
+    Args:
+        piece_type (PieceType): Type of the piece.
+        square (int): Square index of the piece (row * NUM_COLS + col).
+        is_player (bool): True if the piece belongs to the main (bottom) player; False otherwise.
+
+    Returns:
+        Tuple[MoveSet, ...]: Precomputed move sets of the piece.
+    """
+    return (_tables or _load_tables()).move_sets[(piece_type, is_player)][square]
+
+
+def get_move_paths(piece_type: PieceType, square: int, is_player: bool) -> Tuple[MovePath, ...]:
+    """
+    Look up the squares of all in-bound moves a piece can make regardless of validity.
+    The paths are in the same order as the move sets from get_move_sets.
+
+    Args:
+        piece_type (PieceType): Type of the piece.
+        square (int): Square index of the piece (row * NUM_COLS + col).
+        is_player (bool): True if the piece belongs to the main (bottom) player; False otherwise.
+
+    Returns:
+        Tuple[MovePath, ...]: Precomputed (path, dest) squares of the piece's moves.
+    """
+    return (_tables or _load_tables()).move_paths[(piece_type, is_player)][square]
+
+
+def is_square_attacked(cells, square: int, camp: Camp, is_player: bool) -> bool:
+    """
+    Check if any piece of the given camp can move to the given square, by walking
+    rays and reverse move paths outward from the square instead of generating every
+    move of the camp.
+
+    Args:
+        cells (array): Flat cells of the board being played (see Board.cells).
+        square (int): Square index of the target (row * NUM_COLS + col).
+        camp (Camp): Camp of the attacking pieces.
+        is_player (bool): True if the attacking camp is the main (bottom) player; False otherwise.
+
+    Returns:
+        bool: True if the square is attacked by the camp; False otherwise.
+    """
+    target_code = cells[square]
+    # pieces never land on an ally piece
+    if target_code * camp > 0:
+        return False
+    chariot = PieceType.CHARIOT.value * camp
+    cannon = PieceType.CANNON.value * camp
+    can_capture_cannon = abs(target_code) != PieceType.CANNON.value
+    reverse_paths = (_tables or _load_tables()).reverse_paths
+
+    for ray in STRAIGHT_RAYS[square]:
+        hurdle_found = False
+        for ray_square in ray:
+            code = cells[ray_square]
+            if not code:
+                continue
+            if not hurdle_found:
+                if code == chariot:
+                    return True
+                # cannon cannot ever pass cannon
+                if abs(code) == PieceType.CANNON.value:
+                    break
+                hurdle_found = True
+            else:
+                if code == cannon and can_capture_cannon:
+                    return True
+                break
+
+    for piece_type in PieceType:
+        attacker = piece_type.value * camp
+        for origin, path in reverse_paths[(piece_type, is_player)][square]:
+            if cells[origin] == attacker and is_path_valid(cells, attacker, (path, square)):
+                return True
+    return False
+
+
+def is_path_valid(cells, origin_code: int, move_path: MovePath) -> bool:
+    """
+    Check validity of a move path the same way MoveSet.is_valid checks a move set.
+
+    Args:
+        cells (array): Flat cells of the board being played (see Board.cells).
+        origin_code (int): Signed code of the piece being played.
+        move_path (MovePath): (path, dest) squares of the move.
+
+    Returns:
+        bool: True if the move is valid; False otherwise.
+    """
+    path, dest = move_path
+    dest_code = cells[dest]
+    # invalidate if landing on an ally piece
+    if dest_code * origin_code > 0:
+        return False
+    if abs(origin_code) == PieceType.CANNON.value:
+        num_hurdles = 0
+        for square in path:
+            code = cells[square]
+            if code:
+                # cannon cannot ever pass cannon
+                if abs(code) == PieceType.CANNON.value:
+                    return False
+                num_hurdles += 1
+        # cannon needs exactly one hurdle and cannot land on another cannon
+        return num_hurdles == 1 and abs(dest_code) != PieceType.CANNON.value
+    for square in path:
+        # invalidate if there's a blocking piece before the move is complete
+        if cells[square]:
+            return False
+    return True
+
+
+def generate_destinations(cells, square: int, is_player: bool) -> List[Tuple[int, int]]:
+    """
+    Generate the destinations of the piece on a square in one pass, in the same order
+    and with the same duplicates as its valid paths from get_move_paths. Chariots and
+    cannons walk each straight ray once, stopping at the first blocker, instead of
+    validating every prefix of the ray as a separate path.
+
+    Args:
+        cells (array): Flat cells of the board being played (see Board.cells).
+        square (int): Square index of the piece (row * NUM_COLS + col).
+        is_player (bool): True if the piece belongs to the main (bottom) player; False otherwise.
+
+    Returns:
+        List[Tuple[int, int]]: (dest_square, captured_code) of every valid move, where
+          captured_code is the code of the piece on the destination, or 0 if it is empty.
+    """
+    tables = _tables or _load_tables()
+    origin_code = cells[square]
+    piece_value = abs(origin_code)
+    destinations = []
+    if piece_value == PieceType.CHARIOT.value:
+        for ray in STRAIGHT_RAYS[square]:
+            for dest in ray:
+                code = cells[dest]
+                if not code:
+                    destinations.append((dest, 0))
+                    continue
+                if code * origin_code < 0:
+                    destinations.append((dest, code))
+                break
+        move_paths = tables.straight_castle_paths[square]
+    elif piece_value == PieceType.CANNON.value:
+        cannon = PieceType.CANNON.value
+        for ray in STRAIGHT_RAYS[square]:
+            hurdle_found = False
+            for dest in ray:
+                code = cells[dest]
+                if not hurdle_found:
+                    if code:
+                        # cannon cannot ever pass cannon
+                        if abs(code) == cannon:
+                            break
+                        hurdle_found = True
+                    continue
+                if not code:
+                    destinations.append((dest, 0))
+                    continue
+                # cannon cannot land on another cannon
+                if code * origin_code < 0 and abs(code) != cannon:
+                    destinations.append((dest, code))
+                break
+        move_paths = tables.straight_castle_paths[square]
+    else:
+        move_paths = tables.move_paths[(PieceType(piece_value), is_player)][square]
+    for move_path in move_paths:
+        if is_path_valid(cells, origin_code, move_path):
+            dest = move_path[1]
+            destinations.append((dest, cells[dest]))
+    return destinations
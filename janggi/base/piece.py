@@ -1,6 +1,6 @@
+from __future__ import annotations
 from enum import Enum
-from termcolor import colored
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from ..constants import (
     MIN_ROW, MAX_ROW, MIN_COL, MAX_COL,
@@ -12,6 +12,13 @@ from ..constants import (
 from .camp import Camp
 from .location import Location
 
+try:
+    from termcolor import colored
+except ImportError:
+    # termcolor is an optional extra; print pieces without colors when it is missing
+    def colored(text: str, color: str) -> str:
+        return text
+
 
 class PieceType(Enum):
     """Enum class representing a piece's type."""
@@ -34,6 +41,9 @@ PIECE_VALUE = {
     PieceType.GENERAL: 0,
 }
 
+# Largest absolute value of a signed piece code (see Piece.code).
+MAX_CODE = max(piece_type.value for piece_type in PieceType)
+
 from .move import MoveSet  # Imported here to avoid circular import.
 
 
@@ -72,6 +82,34 @@ class Piece:
         else:
             return float(self.piece_type.value)
 
+    @property
+    def code(self) -> int:
+        """
+        Return the signed integer code of the piece, which is how Board stores it.
+        This matches float(piece), except that a piece without a camp is encoded
+        as positive until Board.mark_camp assigns its camp.
+
+        Returns:
+            int: +(self.piece_type.value) for camp cho, -(self.piece_type.value) for camp han.
+        """
+        if self.camp == Camp.HAN:
+            return -self.piece_type.value
+        return self.piece_type.value
+
+    @classmethod
+    def from_code(cls, code: int) -> Optional[Piece]:
+        """
+        Return the piece represented by the given signed integer code.
+        Pieces are shared between all boards, so the returned instance must not be mutated.
+
+        Args:
+            code (int): Signed integer code of the piece (see Piece.code). 0 means no piece.
+
+        Returns:
+            Optional[Piece]: Piece with its camp assigned, or None for an empty cell.
+        """
+        return _PIECE_BY_CODE.get(code)
+
     @property
     def value(self) -> int:
         """
@@ -282,8 +320,28 @@ class Piece:
                 (self._is_castle_vertex(origin) and self._is_castle_vertex(dest)))
 
     def _castle_locations(self, is_player: bool) -> List[Location]:
-        min_row = CASTLE_BOT_MIN_ROW if is_player else CASTLE_TOP_MIN_ROW
-        max_row = CASTLE_BOT_MAX_ROW if is_player else CASTLE_TOP_MAX_ROW
-        min_col = CASTLE_MIN_COL
-        max_col = CASTLE_MAX_COL
-        return [Location(r, c) for r in range(min_row, max_row + 1) for c in range(min_col, max_col + 1)]
+        return _CASTLE_LOCATIONS[bool(is_player)]
+
+
+def _generate_castle_locations(is_player: bool) -> List[Location]:
+    min_row = CASTLE_BOT_MIN_ROW if is_player else CASTLE_TOP_MIN_ROW
+    max_row = CASTLE_BOT_MAX_ROW if is_player else CASTLE_TOP_MAX_ROW
+    min_col = CASTLE_MIN_COL
+    max_col = CASTLE_MAX_COL
+    return [Location.at(r, c) for r in range(min_row, max_row + 1) for c in range(min_col, max_col + 1)]
+
+
+# Castle (palace) locations of the bottom (True) and top (False) castles.
+_CASTLE_LOCATIONS = {
+    True: _generate_castle_locations(True),
+    False: _generate_castle_locations(False),
+}
+
+
+# Shared piece instances for every signed code, used by Board.get.
+_PIECE_BY_CODE = {}
+for _piece_type in PieceType:
+    for _camp in (Camp.CHO, Camp.HAN):
+        _piece = Piece(_piece_type)
+        _piece.camp = _camp
+        _PIECE_BY_CODE[_piece.code] = _piece
@@ -0,0 +1,92 @@
+from typing import Optional
+
+import numpy as np
+
+from ..constants import NUM_ROWS, NUM_COLS, NUM_SQUARES
+from .piece import PieceType
+
+# Planes 0-6 hold the pieces of the camp the planes are encoded for, one plane per
+# PieceType in enum order, and planes 7-13 hold the opponent's pieces the same way.
+NUM_PIECE_PLANES = 2 * len(PieceType)
+# JanggiGame adds a side-to-move plane and a repetition plane after the piece planes.
+TURN_PLANE = NUM_PIECE_PLANES
+REPETITION_PLANE = NUM_PIECE_PLANES + 1
+NUM_PLANES = NUM_PIECE_PLANES + 2
+
+# Signed piece code of every piece plane, from camp cho's point of view.
+_PLANE_CODES = np.array([piece_type.value for piece_type in PieceType] +
+                        [-piece_type.value for piece_type in PieceType],
+                        dtype=np.int8)
+_HAN_PLANE_CODES = -_PLANE_CODES
+
+
+def encode_piece_planes(cells: np.ndarray, camps: np.ndarray, flips: np.ndarray,
+                        out: np.ndarray, scratch: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Encode a batch of boards into one-hot piece planes without a per-cell loop.
+
+    Args:
+        cells (np.ndarray): Int8 array of shape (N, NUM_SQUARES) holding signed piece
+          codes (see Board.cells).
+        camps (np.ndarray): Int8 array of shape (N,) with the camp (1 for cho, -1 for han)
+          whose pieces go to planes 0-6 of each board.
+        flips (np.ndarray): Bool array of shape (N,). Boards that are True are rotated
+          by 180 degrees, so that the other side of the board ends up at the bottom.
+        out (np.ndarray): Array of shape (N, NUM_PIECE_PLANES, NUM_ROWS, NUM_COLS) to write
+          to; it may be a slice of a larger buffer. Any numeric dtype works; float32 and uint8 are the usual choices.
+        scratch (Optional[np.ndarray]): Int8 array of shape (N, NUM_SQUARES) used as working
+          space. Pass one in to avoid allocating it on every call.
+
+    Returns:
+        np.ndarray: The out array.
+    """
+    num_boards = len(cells)
+    if scratch is None:
+        scratch = np.empty((num_boards, NUM_SQUARES), dtype=np.int8)
+    np.copyto(scratch, cells)
+    np.copyto(scratch, cells[:, ::-1], where=flips[:, None])
+    # codes of the camp's own pieces become positive
+    np.multiply(scratch, camps[:, None], out=scratch)
+    np.equal(scratch.reshape(num_boards, 1, NUM_ROWS, NUM_COLS),
+             _PLANE_CODES[None, :, None, None], out=out)
+    return out
+
+
+def encode_board_planes(cells: np.ndarray, camp: int, flip: bool,
+                        out: np.ndarray) -> np.ndarray:
+    """
+    Same as encode_piece_planes, but for a single board.
+
+    Args:
+        cells (np.ndarray): Int8 array of shape (NUM_SQUARES,) holding signed piece codes.
+        camp (int): Camp (1 for cho, -1 for han) whose pieces go to planes 0-6.
+        flip (bool): True to rotate the board by 180 degrees.
+        out (np.ndarray): Array of shape (NUM_PIECE_PLANES, NUM_ROWS, NUM_COLS) to write to.
+
+    Returns:
+        np.ndarray: The out array.
+    """
+    if flip:
+        cells = cells[::-1]
+    plane_codes = _PLANE_CODES if camp > 0 else _HAN_PLANE_CODES
+    np.equal(cells.reshape(1, NUM_ROWS, NUM_COLS), plane_codes[:, None, None], out=out)
+    return out
+
+
+def empty_planes(num_planes: int = NUM_PIECE_PLANES, batch_size: Optional[int] = None,
+                 dtype=np.float32) -> np.ndarray:
+    """
+    Allocate a buffer for encoded planes.
+
+    Args:
+        num_planes (int): Number of planes per board.
+        batch_size (Optional[int]): Number of boards, or None for a single board.
+        dtype: Data type of the buffer.
+
+    Returns:
+        np.ndarray: Zeroed array of shape ([batch_size,] num_planes, NUM_ROWS, NUM_COLS).
+    """
+    shape = (num_planes, NUM_ROWS, NUM_COLS)
+    if batch_size is not None:
+        shape = (batch_size,) + shape
+    return np.zeros(shape, dtype=dtype)
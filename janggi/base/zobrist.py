@@ -0,0 +1,41 @@
+import random
+
+from ..constants import NUM_SQUARES
+from .piece import MAX_CODE
+
+# Fixed seed so that keys are identical across processes and runs.
+ZOBRIST_SEED = 20220613
+
+
+def _generate_keys():
+    rng = random.Random(ZOBRIST_SEED)
+    piece_keys = []
+    for code in range(-MAX_CODE, MAX_CODE + 1):
+        if code == 0:
+            piece_keys.append([0] * NUM_SQUARES)
+        else:
+            piece_keys.append([rng.getrandbits(64) for _ in range(NUM_SQUARES)])
+    turn_key = rng.getrandbits(64)
+    return piece_keys, turn_key
+
+
+# PIECE_KEYS[code + MAX_CODE][square]: 64-bit key of a piece code on a square.
+# Empty cells (code 0) have key 0, so cells can be xor-ed in without checking.
+# TURN_KEY: xor-ed into a position key when it is camp han's turn.
+PIECE_KEYS, TURN_KEY = _generate_keys()
+
+
+def compute_key(cells) -> int:
+    """
+    Compute the Zobrist key of the given cells from scratch.
+
+    Args:
+        cells (array): Flat cells of a board (see Board.cells).
+
+    Returns:
+        int: 64-bit Zobrist key of the pieces on the cells.
+    """
+    key = 0
+    for square, code in enumerate(cells):
+        key ^= PIECE_KEYS[code + MAX_CODE][square]
+    return key
@@ -4,6 +4,7 @@ MIN_COL = 0
 MAX_COL = 8
 NUM_ROWS = MAX_ROW - MIN_ROW + 1
 NUM_COLS = MAX_COL - MIN_COL + 1
+NUM_SQUARES = NUM_ROWS * NUM_COLS
 
 CASTLE_MIN_COL = 3
 CASTLE_MAX_COL = 5
@@ -0,0 +1,383 @@
+import math
+import time
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from ..base.location import Location
+from ..base.piece import PieceType, PIECE_VALUE
+from ..base.planes import NUM_PLANES, NUM_PIECE_PLANES, empty_planes
+from ..game.action_space import ACTION_SPACE_SIZE, decode_action, encode_action
+from ..game.janggi_game import JanggiGame
+
+# An evaluator maps a batch of leaf positions, given as planes (see JanggiGame.to_planes)
+# of shape (B, 16, NUM_ROWS, NUM_COLS) and legal action masks of shape (B, ACTION_SPACE_SIZE),
+# to priors of shape (B, ACTION_SPACE_SIZE) and values in [-1, 1] of shape (B,) for the
+# side to move. Priors do not need to be masked or normalized.
+Evaluator = Callable[[np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray]]
+
+# Marks nodes that have no children block yet.
+NO_CHILDREN = -1
+
+
+class UniformEvaluator:
+    """Evaluator that gives every legal move the same prior and every position a value of 0."""
+
+    def __call__(self, planes: np.ndarray, masks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return masks.astype(np.float32), np.zeros(len(planes), dtype=np.float32)
+
+
+class MaterialEvaluator:
+    """Evaluator with uniform priors that values positions by their material balance."""
+
+    def __init__(self, scale: float = 10.0):
+        """
+        Initialize material evaluator.
+
+        Args:
+            scale (float): Material balance that maps to a value of tanh(1).
+        """
+        self.scale = scale
+        values = [PIECE_VALUE[piece_type] for piece_type in PieceType]
+        self._plane_values = np.array(values + [-value for value in values], dtype=np.float32)
+
+    def __call__(self, planes: np.ndarray, masks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        counts = planes[:, :NUM_PIECE_PLANES].sum(axis=(2, 3), dtype=np.float32)
+        return masks.astype(np.float32), np.tanh(counts @ self._plane_values / self.scale)
+
+
+class MCTSResult(NamedTuple):
+    """
+    Result of MCTS.search.
+
+    Attributes:
+        move (Optional[Tuple[Location, Location]]): Most visited move in (origin, dest) format.
+        value (float): Mean value of the root for the side to move, in [-1, 1].
+        visits (np.ndarray): Visit count of every action (see action_space.encode_action).
+        simulations (int): Number of simulations run by the search.
+        elapsed (float): Search time in seconds.
+    """
+    move: Optional[Tuple[Location, Location]]
+    value: float
+    visits: np.ndarray
+    simulations: int
+    elapsed: float
+
+
+class MCTS:
+    """
+    Monte Carlo tree search with PUCT selection over JanggiGame.
+    The tree lives in flat NumPy arrays indexed by node, and the children of a node
+    take a contiguous block of indices, so a node is a row rather than an object.
+    Leaves are collected in batches with virtual loss steering concurrent descents
+    apart, and each batch is sent to the evaluator at once. The subtree below the
+    played move is kept for the next search (see MCTS.advance).
+    """
+
+    def __init__(self, evaluator: Optional[Evaluator] = None, c_puct: float = 1.5,
+                 batch_size: int = 64, virtual_loss: float = 1.0,
+                 dirichlet_alpha: Optional[float] = None, noise_fraction: float = 0.25,
+                 initial_capacity: int = 1 << 14, seed: Optional[int] = None):
+        """
+        Initialize tree search.
+
+        Args:
+            evaluator (Optional[Evaluator]): Evaluator of leaf positions; UniformEvaluator if None.
+            c_puct (float): Exploration constant of PUCT.
+            batch_size (int): Maximum number of leaves sent to the evaluator at once.
+            virtual_loss (float): Value subtracted per pending descent through a node.
+            dirichlet_alpha (Optional[float]): Concentration of Dirichlet noise mixed into
+              root priors, for self-play exploration. No noise if None.
+            noise_fraction (float): Weight of the noise in the root priors.
+            initial_capacity (int): Number of nodes allocated up front; the arrays grow
+              by doubling.
+            seed (Optional[int]): Seed of the noise.
+        """
+        self.evaluator = evaluator if evaluator is not None else UniformEvaluator()
+        self.c_puct = c_puct
+        self.batch_size = batch_size
+        self.virtual_loss = virtual_loss
+        self.dirichlet_alpha = dirichlet_alpha
+        self.noise_fraction = noise_fraction
+        self.random = np.random.default_rng(seed)
+        self._planes = empty_planes(NUM_PLANES, batch_size)
+        self._masks = np.zeros((batch_size, ACTION_SPACE_SIZE), dtype=bool)
+        self._allocate(initial_capacity)
+        self.reset()
+
+    def __len__(self) -> int:
+        """Return the number of nodes in the tree."""
+        return self._size
+
+    def reset(self):
+        """Drop the whole tree."""
+        self._size = 0
+        self.root = self._new_nodes(1, parent=NO_CHILDREN, actions=[-1])
+        self.root_key = None
+
+    def advance(self, origin: Location, dest: Location):
+        """
+        Move the root to the child reached by the given move, keeping its subtree and
+        dropping the rest of the tree. The tree is reset if the move was not searched.
+        The position key recorded for the child when it was reached becomes the root
+        key, so the next search still checks that it is given the expected position.
+
+        Args:
+            origin (Location): Original location of the piece that was played.
+            dest (Location): Destination of the piece that was played.
+        """
+        action = encode_action(origin, dest)
+        child = NO_CHILDREN
+        first = self._first_child[self.root]
+        if first != NO_CHILDREN:
+            children = np.arange(first, first + self._num_children[self.root])
+            matches = children[self._actions[children] == action]
+            if len(matches):
+                child = int(matches[0])
+        if child == NO_CHILDREN or self._visits[child] == 0:
+            self.reset()
+            return
+        key = int(self._keys[child])
+        self._compact(child)
+        self.root_key = key
+
+    def search(self, game: JanggiGame, num_simulations: int = 800,
+               time_limit: Optional[float] = None) -> MCTSResult:
+        """
+        Run simulations from the current position of the game. The game is walked in
+        place and left in the same state it was given in. The tree is reused if its
+        root is the current position (see MCTS.advance) and reset otherwise.
+
+        Args:
+            game (JanggiGame): Game to search for the current player.
+            num_simulations (int): Number of simulations to run.
+            time_limit (Optional[float]): Time budget in seconds.
+
+        Returns:
+            MCTSResult: Most visited move and visit counts of the root.
+        """
+        start_time = time.perf_counter()
+        key = game.position_key()
+        if self.root_key is not None and self.root_key != key:
+            self.reset()
+        self.root_key = key
+        self._keys[self.root] = key
+        if self.dirichlet_alpha is not None and self._first_child[self.root] != NO_CHILDREN:
+            self._add_noise(self.root)
+
+        simulations = 0
+        while simulations < num_simulations:
+            if time_limit is not None and time.perf_counter() - start_time >= time_limit:
+                break
+            simulations += self._run_batch(game, min(self.batch_size,
+                                                     num_simulations - simulations))
+
+        visits = np.zeros(ACTION_SPACE_SIZE, dtype=np.int32)
+        move = None
+        first = self._first_child[self.root]
+        if first != NO_CHILDREN:
+            children = slice(first, first + self._num_children[self.root])
+            visits[self._actions[children]] = self._visits[children]
+            move = decode_action(int(self._actions[children][np.argmax(self._visits[children])]))
+        root_visits = self._visits[self.root]
+        value = -float(self._value_sums[self.root]) / root_visits if root_visits else 0.0
+        return MCTSResult(move, value, visits, simulations, time.perf_counter() - start_time)
+
+    def get_policy(self, visits: np.ndarray, temperature: float = 1.0) -> np.ndarray:
+        """
+        Turn visit counts into a move distribution.
+
+        Args:
+            visits (np.ndarray): Visit counts from MCTSResult.visits.
+            temperature (float): 0 puts all weight on the most visited move.
+
+        Returns:
+            np.ndarray: Probabilities over the action space.
+        """
+        policy = np.zeros(ACTION_SPACE_SIZE, dtype=np.float32)
+        if temperature == 0:
+            policy[np.argmax(visits)] = 1.0
+            return policy
+        weights = visits.astype(np.float64) ** (1.0 / temperature)
+        policy[:] = weights / weights.sum()
+        return policy
+
+    def _run_batch(self, game: JanggiGame, max_leaves: int) -> int:
+        """Collect up to max_leaves leaves, evaluate them together and back up their values."""
+        paths = []
+        pending = set()
+        simulations = 0
+        while len(paths) < max_leaves and simulations < max_leaves:
+            path, undos = self._select(game)
+            leaf = path[-1]
+            simulations += 1
+            if self._terminal[leaf]:
+                self._backup(path, self._terminal_values[leaf], virtual=False)
+            elif leaf in pending:
+                # another descent of this batch already waits on the leaf
+                simulations -= 1
+                self._unmake(game, undos)
+                break
+            else:
+                self._keys[leaf] = game.position_key()
+                row = len(paths)
+                self._masks[row] = game.legal_action_mask()
+                value = self._check_terminal(game, leaf, undos, self._masks[row])
+                if value is not None:
+                    self._backup(path, value, virtual=False)
+                else:
+                    game.to_planes(self._planes[row])
+                    self._apply_virtual_loss(path)
+                    paths.append(path)
+                    pending.add(leaf)
+            self._unmake(game, undos)
+
+        if paths:
+            priors, values = self.evaluator(self._planes[:len(paths)], self._masks[:len(paths)])
+            for row, path in enumerate(paths):
+                self._expand(path[-1], priors[row], self._masks[row])
+                self._backup(path, float(values[row]), virtual=True)
+        return simulations
+
+    def _select(self, game: JanggiGame) -> Tuple[List[int], list]:
+        """Descend from the root to a leaf, making the moves on the game."""
+        node = self.root
+        path = [node]
+        undos = []
+        while self._first_child[node] != NO_CHILDREN and not self._terminal[node]:
+            node = self._select_child(node)
+            origin, dest = decode_action(int(self._actions[node]))
+            undos.append(game.make_move(origin, dest))
+            path.append(node)
+        return path, undos
+
+    def _select_child(self, node: int) -> int:
+        first = self._first_child[node]
+        children = slice(first, first + self._num_children[node])
+        virtual = self._virtual[children]
+        visits = self._visits[children] + virtual
+        value_sums = self._value_sums[children] - self.virtual_loss * virtual
+        q = np.divide(value_sums, visits, out=np.zeros(len(visits), dtype=np.float32),
+                      where=visits > 0)
+        parent_visits = self._visits[node] + self._virtual[node]
+        u = self.c_puct * self._priors[children] * math.sqrt(max(parent_visits, 1)) / (1 + visits)
+        return first + int(np.argmax(q + u))
+
+    def _check_terminal(self, game: JanggiGame, leaf: int, undos: list,
+                        mask: np.ndarray) -> Optional[float]:
+        """Return the value of a finished game for the side to move, or None if it goes on."""
+        value = None
+        if undos and undos[-1].captured and undos[-1].captured.piece_type == PieceType.GENERAL:
+            value = -1.0
+        elif not mask.any():
+            value = -1.0 if game.is_in_check() else 0.0
+        if value is not None:
+            self._terminal[leaf] = True
+            self._terminal_values[leaf] = value
+        return value
+
+    def _expand(self, node: int, priors: np.ndarray, mask: np.ndarray):
+        actions = np.flatnonzero(mask)
+        node_priors = np.maximum(priors[actions], 0).astype(np.float32)
+        total = node_priors.sum()
+        node_priors = node_priors / total if total > 0 else np.full(
+            len(actions), 1.0 / len(actions), dtype=np.float32)
+        first = self._new_nodes(len(actions), parent=node, actions=actions, priors=node_priors)
+        self._first_child[node] = first
+        self._num_children[node] = len(actions)
+        if node == self.root and self.dirichlet_alpha is not None:
+            self._add_noise(node)
+
+    def _add_noise(self, node: int):
+        first = self._first_child[node]
+        children = slice(first, first + self._num_children[node])
+        noise = self.random.dirichlet([self.dirichlet_alpha] * self._num_children[node])
+        self._priors[children] = ((1 - self.noise_fraction) * self._priors[children] +
+                                  self.noise_fraction * noise)
+
+    def _apply_virtual_loss(self, path: List[int]):
+        self._virtual[path] += 1
+
+    def _backup(self, path: List[int], value: float, virtual: bool):
+        """
+        Add the leaf value, given for the side to move at the leaf, to every node of the path.
+        Node values are kept for the side that made the move into the node.
+        """
+        value = -value
+        for node in reversed(path):
+            self._visits[node] += 1
+            self._value_sums[node] += value
+            if virtual:
+                self._virtual[node] -= 1
+            value = -value
+
+    def _unmake(self, game: JanggiGame, undos: list):
+        for undo in reversed(undos):
+            game.unmake_move(undo)
+
+    def _allocate(self, capacity: int):
+        self._parents = np.full(capacity, NO_CHILDREN, dtype=np.int32)
+        self._actions = np.full(capacity, -1, dtype=np.int16)
+        self._priors = np.zeros(capacity, dtype=np.float32)
+        self._visits = np.zeros(capacity, dtype=np.int32)
+        self._value_sums = np.zeros(capacity, dtype=np.float32)
+        self._virtual = np.zeros(capacity, dtype=np.int32)
+        self._first_child = np.full(capacity, NO_CHILDREN, dtype=np.int32)
+        self._num_children = np.zeros(capacity, dtype=np.int16)
+        self._terminal = np.zeros(capacity, dtype=bool)
+        self._terminal_values = np.zeros(capacity, dtype=np.float32)
+        self._keys = np.zeros(capacity, dtype=np.uint64)
+
+    def _arrays(self) -> List[str]:
+        return ["_parents", "_actions", "_priors", "_visits", "_value_sums", "_virtual",
+                "_first_child", "_num_children", "_terminal", "_terminal_values", "_keys"]
+
+    def _new_nodes(self, count: int, parent: int, actions, priors=None) -> int:
+        """Allocate a contiguous block of count fresh nodes and return its first index."""
+        first = self._size
+        if first + count > len(self._parents):
+            capacity = len(self._parents)
+            while capacity < first + count:
+                capacity *= 2
+            for name in self._arrays():
+                old = getattr(self, name)
+                new = np.resize(old, capacity)
+                setattr(self, name, new)
+        block = slice(first, first + count)
+        self._parents[block] = parent
+        self._actions[block] = actions
+        self._priors[block] = priors if priors is not None else 0.0
+        self._visits[block] = 0
+        self._value_sums[block] = 0.0
+        self._virtual[block] = 0
+        self._first_child[block] = NO_CHILDREN
+        self._num_children[block] = 0
+        self._terminal[block] = False
+        self._terminal_values[block] = 0.0
+        self._keys[block] = 0
+        self._size = first + count
+        return first
+
+    def _compact(self, new_root: int):
+        """Keep only the subtree of new_root, renumbered so that it becomes node 0."""
+        order = [new_root]
+        for node in order:
+            first = int(self._first_child[node])
+            if first != NO_CHILDREN:
+                order.extend(range(first, first + int(self._num_children[node])))
+        order = np.array(order, dtype=np.int64)
+        remap = np.full(self._size, NO_CHILDREN, dtype=np.int32)
+        remap[order] = np.arange(len(order), dtype=np.int32)
+        for name in self._arrays():
+            array = getattr(self, name)
+            array[:len(order)] = array[order]
+        kept = slice(0, len(order))
+        self._parents[kept] = np.where(self._parents[kept] >= 0,
+                                       remap[np.maximum(self._parents[kept], 0)], NO_CHILDREN)
+        self._first_child[kept] = np.where(self._first_child[kept] >= 0,
+                                           remap[np.maximum(self._first_child[kept], 0)],
+                                           NO_CHILDREN)
+        self._parents[0] = NO_CHILDREN
+        self._actions[0] = -1
+        self._size = len(order)
+        self.root = 0
@@ -0,0 +1,332 @@
+import argparse
+import random
+import struct
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from ..constants import NUM_SQUARES
+from ..base.board import Board
+from ..base.camp import Camp
+from ..base.location import Location
+from ..base.zobrist import TURN_KEY, compute_key
+from ..game.corpus import CorpusReader
+from ..game.game_log import GameLog
+from ..game.janggi_game import JanggiGame
+
+# A book file is a header followed by the arrays of OpeningBook in the order keys,
+# starts, moves, counts, scores. All integers are little-endian.
+BOOK_MAGIC = b"JGOB"
+BOOK_VERSION = 1
+HEADER_STRUCT = struct.Struct("<4sHHQQ")
+KEY_DTYPE = np.dtype("<u8")
+START_DTYPE = np.dtype("<u4")
+MOVE_DTYPE = np.dtype("<u2")
+COUNT_DTYPE = np.dtype("<u4")
+SCORE_DTYPE = np.dtype("<f4")
+
+
+class BookMove(NamedTuple):
+    """
+    Statistics of a move played from a book position.
+
+    Attributes:
+        origin (Location): Original location of the piece played.
+        dest (Location): Destination of the piece played.
+        count (int): Number of games the move was played in.
+        score (float): Mean result for the side that played it (1 win, 0.5 draw, 0 loss).
+    """
+    origin: Location
+    dest: Location
+    count: int
+    score: float
+
+
+def normalized_key(game: JanggiGame) -> int:
+    """
+    Return the position key of the game as if camp cho were the bottom camp.
+    Boards with camp han at the bottom are the same positions rotated by 180 degrees,
+    so both orientations share book entries.
+
+    Args:
+        game (JanggiGame): Game in the position to look up.
+
+    Returns:
+        int: 64-bit position key, including the side to move.
+    """
+    if game.player == Camp.CHO:
+        return game.position_key()
+    key = compute_key(game.board.cells[::-1])
+    return key ^ TURN_KEY if game.turn == Camp.HAN else key
+
+
+def _normalize_square(square: int, bottom_camp: Camp) -> int:
+    return square if bottom_camp == Camp.CHO else NUM_SQUARES - 1 - square
+
+
+class OpeningBook:
+    """
+    Opening book of move statistics per position. Positions are kept as a sorted
+    array of normalized position keys (see normalized_key), and the moves of the
+    position at index i take rows starts[i] to starts[i + 1] of the move arrays,
+    most played first. Lookups are binary searches, and loaded books are
+    memory-mapped, so large books open instantly.
+    """
+
+    def __init__(self, keys: np.ndarray, starts: np.ndarray, moves: np.ndarray,
+                 counts: np.ndarray, scores: np.ndarray, max_ply: int):
+        """
+        Initialize opening book from its arrays (see OpeningBookBuilder.build).
+
+        Args:
+            keys (np.ndarray): Sorted unique normalized position keys.
+            starts (np.ndarray): First move row of every position, plus the number of rows.
+            moves (np.ndarray): Move of every row as origin_square * NUM_SQUARES + dest_square,
+              in the cho-bottom orientation.
+            counts (np.ndarray): Number of games every move was played in.
+            scores (np.ndarray): Sum of the results of every move for the side that played it.
+            max_ply (int): Number of plies of every game the book was built from.
+        """
+        self.keys = keys
+        self.starts = starts
+        self.moves = moves
+        self.counts = counts
+        self.scores = scores
+        self.max_ply = max_ply
+
+    def __len__(self) -> int:
+        """Return the number of positions in the book."""
+        return len(self.keys)
+
+    def __contains__(self, game: JanggiGame) -> bool:
+        return self._find(normalized_key(game)) >= 0
+
+    @classmethod
+    def load(cls, path: str) -> "OpeningBook":
+        """
+        Memory-map a book file written by OpeningBook.save.
+
+        Args:
+            path (str): Path of the book file.
+
+        Raises:
+            Exception: When the file is not a book file or has an unsupported version.
+
+        Returns:
+            OpeningBook: The book.
+        """
+        with open(path, "rb") as book_file:
+            magic, version, max_ply, num_positions, num_rows = HEADER_STRUCT.unpack(
+                book_file.read(HEADER_STRUCT.size))
+        if magic != BOOK_MAGIC:
+            raise Exception(f"{path} is not an opening book file.")
+        if version != BOOK_VERSION:
+            raise Exception(f"Unsupported opening book version {version} in {path}.")
+        arrays = []
+        offset = HEADER_STRUCT.size
+        for dtype, length in [(KEY_DTYPE, num_positions), (START_DTYPE, num_positions + 1),
+                              (MOVE_DTYPE, num_rows), (COUNT_DTYPE, num_rows),
+                              (SCORE_DTYPE, num_rows)]:
+            arrays.append(np.memmap(path, dtype=dtype, mode="r", offset=offset,
+                                    shape=(length,)).view(np.ndarray) if length else
+                          np.zeros(length, dtype=dtype))
+            offset += dtype.itemsize * length
+        return cls(*arrays, max_ply)
+
+    def save(self, path: str):
+        """
+        Write the book into a file that OpeningBook.load can memory-map.
+
+        Args:
+            path (str): Path of the book file.
+        """
+        with open(path, "wb") as book_file:
+            book_file.write(HEADER_STRUCT.pack(BOOK_MAGIC, BOOK_VERSION, self.max_ply,
+                                               len(self.keys), len(self.moves)))
+            for array, dtype in [(self.keys, KEY_DTYPE), (self.starts, START_DTYPE),
+                                 (self.moves, MOVE_DTYPE), (self.counts, COUNT_DTYPE),
+                                 (self.scores, SCORE_DTYPE)]:
+                book_file.write(np.ascontiguousarray(array, dtype=dtype).tobytes())
+
+    def probe(self, game: JanggiGame) -> List[BookMove]:
+        """
+        Look up the book moves of the current position of the game.
+
+        Args:
+            game (JanggiGame): Game in the position to look up.
+
+        Returns:
+            List[BookMove]: Book moves in the game's orientation, most played first.
+              Empty if the position is not in the book.
+        """
+        index = self._find(normalized_key(game))
+        if index < 0:
+            return []
+        book_moves = []
+        for row in range(int(self.starts[index]), int(self.starts[index + 1])):
+            origin_square, dest_square = divmod(int(self.moves[row]), NUM_SQUARES)
+            origin_square = _normalize_square(origin_square, game.player)
+            dest_square = _normalize_square(dest_square, game.player)
+            count = int(self.counts[row])
+            book_moves.append(BookMove(Location.from_index(origin_square),
+                                       Location.from_index(dest_square),
+                                       count, float(self.scores[row]) / count))
+        return book_moves
+
+    def choose(self, game: JanggiGame, temperature: float = 0.0, min_count: int = 1,
+               rng: Optional[random.Random] = None) -> Optional[Tuple[Location, Location]]:
+        """
+        Pick a legal book move for the current position of the game.
+
+        Args:
+            game (JanggiGame): Game in the position to look up.
+            temperature (float): 0 picks the most played move; otherwise moves are drawn
+              with weights count ** (1 / temperature).
+            min_count (int): Ignore moves played in fewer games.
+            rng (Optional[random.Random]): Random number generator to draw with.
+
+        Returns:
+            Optional[Tuple[Location, Location]]: Move in (origin, dest) format, or None if
+              the book has no move for the position.
+        """
+        legal_actions = game.get_legal_actions()
+        book_moves = [book_move for book_move in self.probe(game)
+                      if book_move.count >= min_count and
+                      (book_move.origin, book_move.dest) in legal_actions]
+        if not book_moves:
+            return None
+        if temperature == 0:
+            book_move = book_moves[0]
+        else:
+            weights = [book_move.count ** (1.0 / temperature) for book_move in book_moves]
+            book_move = (rng or random).choices(book_moves, weights)[0]
+        return book_move.origin, book_move.dest
+
+    def _find(self, key: int) -> int:
+        index = int(np.searchsorted(self.keys, np.uint64(key)))
+        if index < len(self.keys) and int(self.keys[index]) == key:
+            return index
+        return -1
+
+
+class OpeningBookBuilder:
+    """
+    Builder that aggregates move statistics of the first plies of many games.
+    Games are replayed on a cho-bottom board, and (key, move, result) rows are
+    buffered and periodically merged into sorted aggregate arrays, so memory
+    grows with the number of distinct book moves rather than with the number of games.
+    """
+
+    def __init__(self, max_ply: int = 20, flush_rows: int = 1 << 20):
+        """
+        Initialize opening book builder.
+
+        Args:
+            max_ply (int): Number of plies of every game to add to the book.
+            flush_rows (int): Number of buffered rows that triggers a merge.
+        """
+        self.max_ply = max_ply
+        self.flush_rows = flush_rows
+        self.num_games = 0
+        self._keys = np.zeros(0, dtype=np.uint64)
+        self._moves = np.zeros(0, dtype=np.uint16)
+        self._counts = np.zeros(0, dtype=np.uint32)
+        self._scores = np.zeros(0, dtype=np.float32)
+        self._buffer: List[Tuple[int, int, float]] = []
+
+    def add(self, game_log: GameLog, winner: Optional[Camp] = None):
+        """
+        Add the first max_ply moves of a game.
+
+        Args:
+            game_log (GameLog): Game to add.
+            winner (Optional[Camp]): Camp that won the game, or None for a draw.
+        """
+        board = Board.full_board_from_formations(
+            game_log.cho_formation, game_log.han_formation, Camp.CHO)
+        turn = Camp.CHO
+        for origin, dest in game_log.move_log[:self.max_ply]:
+            origin_square = _normalize_square(origin.index, game_log.bottom_camp)
+            dest_square = _normalize_square(dest.index, game_log.bottom_camp)
+            score = 0.5 if winner is None else float(winner == turn)
+            self._buffer.append((board.position_key(turn),
+                                 origin_square * NUM_SQUARES + dest_square, score))
+            board.move_square(origin_square, dest_square)
+            turn = turn.opponent
+        self.num_games += 1
+        if len(self._buffer) >= self.flush_rows:
+            self._flush()
+
+    def add_all(self, game_logs: Iterable[GameLog],
+                winners: Optional[Iterable[Optional[Camp]]] = None):
+        """
+        Add many games.
+
+        Args:
+            game_logs (Iterable[GameLog]): Games to add.
+            winners (Optional[Iterable[Optional[Camp]]]): Winner of each game, if known.
+        """
+        if winners is None:
+            for game_log in game_logs:
+                self.add(game_log)
+        else:
+            for game_log, winner in zip(game_logs, winners):
+                self.add(game_log, winner)
+
+    def build(self, min_count: int = 1) -> OpeningBook:
+        """
+        Build the book from the games added so far.
+
+        Args:
+            min_count (int): Leave out moves played in fewer games.
+
+        Returns:
+            OpeningBook: The book.
+        """
+        self._flush()
+        keep = self._counts >= min_count
+        keys, moves = self._keys[keep], self._moves[keep]
+        counts, scores = self._counts[keep], self._scores[keep]
+        # most played moves first within every position
+        order = np.lexsort((-counts.astype(np.int64), keys))
+        keys, moves, counts, scores = keys[order], moves[order], counts[order], scores[order]
+        unique_keys, starts = np.unique(keys, return_index=True)
+        starts = np.append(starts, len(keys)).astype(np.uint32)
+        return OpeningBook(unique_keys, starts, moves, counts, scores, self.max_ply)
+
+    def _flush(self):
+        """Merge buffered rows into the aggregate arrays."""
+        if not self._buffer:
+            return
+        buffer_keys, buffer_moves, buffer_scores = zip(*self._buffer)
+        self._buffer = []
+        keys = np.concatenate((self._keys, np.array(buffer_keys, dtype=np.uint64)))
+        moves = np.concatenate((self._moves, np.array(buffer_moves, dtype=np.uint16)))
+        counts = np.concatenate((self._counts, np.ones(len(buffer_keys), dtype=np.uint32)))
+        scores = np.concatenate((self._scores, np.array(buffer_scores, dtype=np.float32)))
+        order = np.lexsort((moves, keys))
+        keys, moves, counts, scores = keys[order], moves[order], counts[order], scores[order]
+        is_new = np.ones(len(keys), dtype=bool)
+        is_new[1:] = (keys[1:] != keys[:-1]) | (moves[1:] != moves[:-1])
+        group_starts = np.flatnonzero(is_new)
+        self._keys = keys[group_starts]
+        self._moves = moves[group_starts]
+        self._counts = np.add.reduceat(counts, group_starts).astype(np.uint32)
+        self._scores = np.add.reduceat(scores, group_starts).astype(np.float32)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build an opening book from a game corpus.")
+    parser.add_argument("corpus", nargs="+", help="paths of game corpus files")
+    parser.add_argument("--out", required=True, help="path of the book file to write")
+    parser.add_argument("--max-ply", type=int, default=20)
+    parser.add_argument("--min-count", type=int, default=1)
+    args = parser.parse_args()
+    builder = OpeningBookBuilder(args.max_ply)
+    for corpus_path in args.corpus:
+        with CorpusReader(corpus_path) as reader:
+            for index in range(len(reader)):
+                builder.add(*reader.read(index))
+    book = builder.build(args.min_count)
+    book.save(args.out)
+    print(f"{len(book)} positions and {len(book.moves)} moves from {builder.num_games} games")
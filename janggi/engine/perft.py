@@ -0,0 +1,182 @@
+import argparse
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from ..base.camp import Camp
+from ..base.formation import Formation
+from ..base.location import Location
+from ..base.piece import PieceType
+from ..game.janggi_game import JanggiGame
+
+# Formations a camp can start the game with.
+FORMATIONS = [
+    Formation.INNER_ELEPHANT,
+    Formation.OUTER_ELEPHANT,
+    Formation.LEFT_ELEPHANT,
+    Formation.RIGHT_ELEPHANT,
+]
+
+# Expected perft counts from the initial position, keyed by (cho_formation, han_formation).
+# The i-th count is for depth i+1. Counts do not depend on which camp is the bottom camp.
+PERFT_TABLE: Dict[Tuple[Formation, Formation], Tuple[int, ...]] = {
+    (Formation.INNER_ELEPHANT, Formation.INNER_ELEPHANT): (31, 961, 30415, 962908),
+    (Formation.INNER_ELEPHANT, Formation.OUTER_ELEPHANT): (31, 961, 30415, 970530),
+    (Formation.INNER_ELEPHANT, Formation.LEFT_ELEPHANT): (31, 961, 30415, 966719),
+    (Formation.INNER_ELEPHANT, Formation.RIGHT_ELEPHANT): (31, 961, 30415, 966719),
+    (Formation.OUTER_ELEPHANT, Formation.INNER_ELEPHANT): (31, 961, 30659, 970784),
+    (Formation.OUTER_ELEPHANT, Formation.OUTER_ELEPHANT): (31, 961, 30659, 978470),
+    (Formation.OUTER_ELEPHANT, Formation.LEFT_ELEPHANT): (31, 961, 30659, 974627),
+    (Formation.OUTER_ELEPHANT, Formation.RIGHT_ELEPHANT): (31, 961, 30659, 974627),
+    (Formation.LEFT_ELEPHANT, Formation.INNER_ELEPHANT): (31, 961, 30537, 966846),
+    (Formation.LEFT_ELEPHANT, Formation.OUTER_ELEPHANT): (31, 961, 30537, 974500),
+    (Formation.LEFT_ELEPHANT, Formation.LEFT_ELEPHANT): (31, 961, 30537, 970673),
+    (Formation.LEFT_ELEPHANT, Formation.RIGHT_ELEPHANT): (31, 961, 30537, 970673),
+    (Formation.RIGHT_ELEPHANT, Formation.INNER_ELEPHANT): (31, 961, 30537, 966846),
+    (Formation.RIGHT_ELEPHANT, Formation.OUTER_ELEPHANT): (31, 961, 30537, 974500),
+    (Formation.RIGHT_ELEPHANT, Formation.LEFT_ELEPHANT): (31, 961, 30537, 970673),
+    (Formation.RIGHT_ELEPHANT, Formation.RIGHT_ELEPHANT): (31, 961, 30537, 970673),
+}
+
+
+class PerftResult(NamedTuple):
+    """
+    Result of a single perft run.
+
+    Attributes:
+        cho_formation (Formation): Formation of camp cho.
+        han_formation (Formation): Formation of camp han.
+        depth (int): Depth of the run.
+        nodes (int): Number of leaf nodes counted.
+        expected (Optional[int]): Count from PERFT_TABLE, if there is one.
+        elapsed (float): Time taken in seconds.
+    """
+    cho_formation: Formation
+    han_formation: Formation
+    depth: int
+    nodes: int
+    expected: Optional[int]
+    elapsed: float
+
+    @property
+    def nps(self) -> float:
+        """Return the number of leaf nodes counted per second."""
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def is_correct(self) -> bool:
+        """Return True unless the count differs from the expected count."""
+        return self.expected is None or self.nodes == self.expected
+
+
+def perft(game: JanggiGame, depth: int) -> int:
+    """
+    Count leaf nodes of the move tree of the game up to the given depth.
+    Actions come from JanggiGame.get_all_actions, and positions where a general
+    has been captured are not expanded any further.
+
+    Args:
+        game (JanggiGame): Game whose current position is the root. It is left unchanged.
+        depth (int): Number of plies to walk.
+
+    Returns:
+        int: Number of leaf nodes.
+    """
+    if depth == 0:
+        return 1
+    actions = game.get_all_actions()
+    if depth == 1:
+        return len(actions)
+    nodes = 0
+    for origin, dest in actions:
+        undo = game.make_move(origin, dest)
+        if not (undo.captured and undo.captured.piece_type == PieceType.GENERAL):
+            nodes += perft(game, depth - 1)
+        game.unmake_move(undo)
+    return nodes
+
+
+def divide(game: JanggiGame, depth: int) -> List[Tuple[Tuple[Location, Location], int]]:
+    """
+    Run perft below each root action separately.
+
+    Args:
+        game (JanggiGame): Game whose current position is the root. It is left unchanged.
+        depth (int): Number of plies to walk, including the root action.
+
+    Returns:
+        List[Tuple[Tuple[Location, Location], int]]: Leaf count for every root action.
+    """
+    counts = []
+    for origin, dest in game.get_all_actions():
+        undo = game.make_move(origin, dest)
+        if undo.captured and undo.captured.piece_type == PieceType.GENERAL:
+            nodes = 1 if depth == 1 else 0
+        else:
+            nodes = perft(game, depth - 1)
+        game.unmake_move(undo)
+        counts.append(((origin, dest), nodes))
+    return counts
+
+
+def run_perft(cho_formation: Formation, han_formation: Formation, depth: int) -> PerftResult:
+    """
+    Run perft from the initial position of the given formations and time it.
+
+    Args:
+        cho_formation (Formation): Formation of camp cho.
+        han_formation (Formation): Formation of camp han.
+        depth (int): Number of plies to walk.
+
+    Returns:
+        PerftResult: Leaf count, expected count and timing.
+    """
+    game = JanggiGame(Camp.CHO, cho_formation, han_formation)
+    start_time = time.perf_counter()
+    nodes = perft(game, depth)
+    elapsed = time.perf_counter() - start_time
+    expected_counts = PERFT_TABLE.get((cho_formation, han_formation), ())
+    expected = expected_counts[depth - 1] if depth <= len(expected_counts) else None
+    return PerftResult(cho_formation, han_formation, depth, nodes, expected, elapsed)
+
+
+def run_benchmark(depth: int = 3) -> List[PerftResult]:
+    """
+    Run perft for all 16 formation combinations and print counts and nodes per second.
+
+    Args:
+        depth (int): Number of plies to walk.
+
+    Returns:
+        List[PerftResult]: Results of all runs.
+    """
+    results = []
+    for cho_formation in FORMATIONS:
+        for han_formation in FORMATIONS:
+            result = run_perft(cho_formation, han_formation, depth)
+            results.append(result)
+            print(f"{cho_formation.name:>14} {han_formation.name:>14} depth {depth}: "
+                  f"{result.nodes:>10} nodes {result.nps:>10.0f} nps "
+                  f"{'ok' if result.is_correct else f'MISMATCH (expected {result.expected})'}")
+    total_nodes = sum(result.nodes for result in results)
+    total_elapsed = sum(result.elapsed for result in results)
+    print(f"total: {total_nodes} nodes in {total_elapsed:.2f}s "
+          f"({total_nodes / total_elapsed:.0f} nps)")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Perft benchmark of the Janggi move generator.")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--divide", nargs=2, metavar=("CHO_FORMATION", "HAN_FORMATION"),
+                        help="print counts per root move for the given formations, "
+                             "e.g. --divide INNER_ELEPHANT LEFT_ELEPHANT")
+    args = parser.parse_args()
+    if args.divide:
+        game = JanggiGame(Camp.CHO, Formation[args.divide[0]], Formation[args.divide[1]])
+        counts = divide(game, args.depth)
+        for (origin, dest), nodes in counts:
+            print(f"{origin}->{dest}: {nodes}")
+        print(f"total: {sum(nodes for _, nodes in counts)}")
+    else:
+        run_benchmark(args.depth)
@@ -0,0 +1,309 @@
+import logging
+import time
+from typing import NamedTuple, Optional, Tuple
+
+from ..constants import NUM_SQUARES
+from ..base.location import Location
+from ..base.piece import PieceType, PIECE_VALUE
+from ..game.janggi_game import JanggiGame
+from .opening_book import OpeningBook
+from .tablebase import LOSS, WIN, Tablebase, TablebaseEntry
+from .transposition_table import (
+    Bound,
+    NO_MOVE,
+    TranspositionTable,
+    encode_move,
+)
+
+# Score of capturing the enemy general, reduced by the ply it happens at.
+MATE_SCORE = 1000.0
+# Scores beyond this are mate scores.
+MATE_THRESHOLD = MATE_SCORE - 256
+# Number of nodes searched between two checks of the time and node budget.
+CHECK_INTERVAL = 1024
+
+# Move ordering bonuses; captures are ordered by victim first, then attacker.
+_TT_MOVE_BONUS = 1 << 30
+_CAPTURE_BONUS = 1 << 24
+_KILLER_BONUS = 1 << 20
+
+logger = logging.getLogger(__name__)
+
+
+class SearchResult(NamedTuple):
+    """
+    Result of AlphaBetaSearch.search.
+
+    Attributes:
+        move (Optional[Tuple[Location, Location]]): Best move in (origin, dest) format.
+        score (float): Score of the best move for the side to move.
+        depth (int): Deepest fully searched iteration.
+        nodes (int): Number of nodes visited.
+        elapsed (float): Search time in seconds.
+        iterations (Tuple[Tuple[int, float, int, float], ...]): (depth, score, nodes,
+          elapsed) after each iteration of iterative deepening.
+    """
+    move: Optional[Tuple[Location, Location]]
+    score: float
+    depth: int
+    nodes: int
+    elapsed: float
+    iterations: Tuple[Tuple[int, float, int, float], ...] = ()
+
+    @property
+    def nps(self) -> float:
+        """Return the number of nodes searched per second."""
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class AlphaBetaSearch:
+    """
+    Negamax alpha-beta search with iterative deepening over JanggiGame.
+    Positions are scored by material from the side to move's point of view, and
+    the game is walked in place with JanggiGame.make_move / unmake_move.
+    The root searches legal moves only; deeper nodes search all moves and leave a
+    general en prise to be captured. A node whose every move loses the general is
+    checkmate when in check and a stalemate draw otherwise, as in JanggiGame.
+    Moves are ordered by transposition table move, captures (most valuable victim
+    first, least valuable attacker next), killer moves, then history heuristic.
+    Positions found in the opening book are answered from the book without searching,
+    and positions covered by the endgame tablebase are scored from it instead of searched.
+    """
+
+    def __init__(self, tt: Optional[TranspositionTable] = None, max_depth: int = 64,
+                 book: Optional[OpeningBook] = None,
+                 tablebase: Optional[Tablebase] = None):
+        """
+        Initialize search.
+
+        Args:
+            tt (Optional[TranspositionTable]): Table shared between searches. A 16MB
+              table is created if not given.
+            max_depth (int): Maximum depth of iterative deepening.
+            book (Optional[OpeningBook]): Opening book to play the most played move from.
+            tablebase (Optional[Tablebase]): Endgame tables to score positions with few pieces.
+        """
+        self.tt = tt if tt is not None else TranspositionTable(16 * 1024 * 1024)
+        self.max_depth = max_depth
+        self.book = book
+        self.tablebase = tablebase
+        self.nodes = 0
+        self._killers = []
+        self._history = [0] * (NUM_SQUARES * NUM_SQUARES)
+        self._deadline = None
+        self._node_limit = None
+        self._stopped = False
+
+    def search(self, game: JanggiGame, max_depth: Optional[int] = None,
+               time_limit: Optional[float] = None,
+               node_limit: Optional[int] = None) -> SearchResult:
+        """
+        Search the current position of the game and return the best move found.
+        The game is left in the same state it was given in.
+
+        Args:
+            game (JanggiGame): Game to search for the current player.
+            max_depth (Optional[int]): Maximum depth; defaults to self.max_depth.
+            time_limit (Optional[float]): Time budget in seconds.
+            node_limit (Optional[int]): Node budget.
+
+        Returns:
+            SearchResult: Best move of the deepest completed iteration and search stats.
+              Book moves come with depth 0 and no nodes.
+        """
+        max_depth = max_depth or self.max_depth
+        start_time = time.perf_counter()
+        if self.book is not None:
+            book_move = self.book.choose(game)
+            if book_move is not None:
+                return SearchResult(book_move, 0.0, 0, 0, time.perf_counter() - start_time)
+        self._deadline = start_time + time_limit if time_limit else None
+        self._node_limit = node_limit
+        self._stopped = False
+        self.nodes = 0
+        self._killers = [[NO_MOVE, NO_MOVE] for _ in range(max_depth + 1)]
+        self._history = [0] * (NUM_SQUARES * NUM_SQUARES)
+        self.tt.new_search()
+
+        best_move, best_score, completed_depth = None, 0.0, 0
+        iterations = []
+        for depth in range(1, max_depth + 1):
+            score, move = self._search_root(game, depth)
+            # a stopped iteration is only used if no iteration has completed yet
+            if move is not None and (not self._stopped or best_move is None):
+                best_move, best_score = move, score
+            if not self._stopped:
+                completed_depth = depth
+            elapsed = time.perf_counter() - start_time
+            iterations.append((depth, best_score, self.nodes, elapsed))
+            logger.debug("depth %d score %s nodes %d nps %.0f", depth, best_score,
+                         self.nodes, self.nodes / elapsed if elapsed > 0 else 0.0)
+            if self._stopped or abs(best_score) >= MATE_THRESHOLD:
+                break
+        elapsed = time.perf_counter() - start_time
+        return SearchResult(best_move, best_score, completed_depth, self.nodes, elapsed,
+                            tuple(iterations))
+
+    def _search_root(self, game: JanggiGame, depth: int):
+        alpha, beta = -MATE_SCORE - 1, MATE_SCORE + 1
+        best_score, best_move, best_move_key = -MATE_SCORE - 1, None, NO_MOVE
+        entry = self.tt.probe(game.position_key())
+        tt_move = entry.move if entry is not None else NO_MOVE
+        actions = game.get_legal_actions()
+        for (origin, dest), move_key in self._ordered_actions(game, actions, 0, tt_move):
+            score = self._score_move(game, origin, dest, depth, alpha, beta, 0)
+            if self._stopped:
+                break
+            if score > best_score:
+                best_score, best_move, best_move_key = score, (origin, dest), move_key
+            alpha = max(alpha, score)
+        if best_move is not None and not self._stopped:
+            self.tt.store(game.position_key(), depth, Bound.EXACT,
+                          best_score, best_move_key)
+        return best_score, best_move
+
+    def _negamax(self, game: JanggiGame, depth: int, alpha: float, beta: float, ply: int) -> float:
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0:
+            self._check_budget()
+        if self._stopped:
+            return 0.0
+
+        if self.tablebase is not None:
+            tablebase_entry = self.tablebase.probe(game)
+            if tablebase_entry is not None:
+                return _score_from_tablebase(tablebase_entry, ply)
+
+        key = game.position_key()
+        entry = self.tt.probe(key)
+        if entry is not None and entry.depth >= depth:
+            score = _score_from_tt(entry.score, ply)
+            if entry.bound == Bound.EXACT:
+                return score
+            if entry.bound == Bound.LOWER and score >= beta:
+                return score
+            if entry.bound == Bound.UPPER and score <= alpha:
+                return score
+
+        if depth == 0:
+            return self._evaluate(game)
+
+        original_alpha = alpha
+        best_score, best_move_key = -MATE_SCORE - 1, NO_MOVE
+        tt_move = entry.move if entry is not None else NO_MOVE
+        actions = game.get_all_actions()
+        for (origin, dest), move_key in self._ordered_actions(game, actions, ply, tt_move):
+            score = self._score_move(game, origin, dest, depth, alpha, beta, ply)
+            if self._stopped:
+                return 0.0
+            if score > best_score:
+                best_score, best_move_key = score, move_key
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if game.board.cells[move_key % NUM_SQUARES] == 0:
+                    self._update_quiet_move(move_key, depth, ply)
+                break
+
+        if best_move_key == NO_MOVE:
+            # no move to make; leave the position to the static evaluation
+            return self._evaluate(game)
+        if best_score == -(MATE_SCORE - ply - 1):
+            # every move lets the general be captured, so there is no legal move
+            if not game.is_in_check():
+                best_score = 0.0
+
+        if best_score <= original_alpha:
+            bound = Bound.UPPER
+        elif best_score >= beta:
+            bound = Bound.LOWER
+        else:
+            bound = Bound.EXACT
+        self.tt.store(key, depth, bound, _score_to_tt(best_score, ply), best_move_key)
+        return best_score
+
+    def _score_move(self, game: JanggiGame, origin: Location, dest: Location,
+                    depth: int, alpha: float, beta: float, ply: int) -> float:
+        undo = game.make_move(origin, dest)
+        if undo.captured and undo.captured.piece_type == PieceType.GENERAL:
+            score = MATE_SCORE - ply
+        else:
+            score = -self._negamax(game, depth - 1, -beta, -alpha, ply + 1)
+        game.unmake_move(undo)
+        return score
+
+    def _evaluate(self, game: JanggiGame) -> float:
+        """Return material balance from the side to move's point of view."""
+        return (game.cho_score - game.han_score) * game.turn
+
+    def _ordered_actions(self, game: JanggiGame, actions: list, ply: int,
+                         tt_move: int = NO_MOVE):
+        cells = game.board.cells
+        killers = self._killers[ply] if ply < len(self._killers) else ()
+        scored = []
+        for origin, dest in actions:
+            origin_square = origin.index
+            dest_square = dest.index
+            move_key = encode_move(origin_square, dest_square)
+            victim = cells[dest_square]
+            if move_key == tt_move:
+                order = _TT_MOVE_BONUS
+            elif victim:
+                attacker = cells[origin_square]
+                order = (_CAPTURE_BONUS + _piece_value(victim) * 100
+                         - _piece_value(attacker))
+            elif move_key in killers:
+                order = _KILLER_BONUS
+            else:
+                order = self._history[move_key]
+            scored.append((order, (origin, dest), move_key))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [(action, move_key) for _, action, move_key in scored]
+
+    def _update_quiet_move(self, move_key: int, depth: int, ply: int):
+        killers = self._killers[ply]
+        if killers[0] != move_key:
+            killers[1] = killers[0]
+            killers[0] = move_key
+        self._history[move_key] += depth * depth
+
+    def _check_budget(self):
+        if self._node_limit is not None and self.nodes >= self._node_limit:
+            self._stopped = True
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            self._stopped = True
+
+
+def _score_to_tt(score: float, ply: int) -> float:
+    """Make mate scores relative to the stored node instead of the root."""
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _score_from_tt(score: float, ply: int) -> float:
+    """Make stored mate scores relative to the root again."""
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+def _score_from_tablebase(entry: TablebaseEntry, ply: int) -> float:
+    """Turn a tablebase result into a mate score relative to the root."""
+    if entry.wdl == WIN:
+        return MATE_SCORE - ply - entry.dtm
+    if entry.wdl == LOSS:
+        return -(MATE_SCORE - ply - entry.dtm)
+    return 0.0
+
+
+def _piece_value(code: int) -> int:
+    """Return ordering value of a piece code; the general is worth the most."""
+    piece_type = PieceType(abs(code))
+    if piece_type == PieceType.GENERAL:
+        return 100
+    return PIECE_VALUE[piece_type]
@@ -0,0 +1,834 @@
+import argparse
+import itertools
+import os
+import struct
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..constants import (
+    MIN_COL,
+    MAX_COL,
+    NUM_COLS,
+    NUM_SQUARES,
+    CASTLE_MIN_COL,
+    CASTLE_MAX_COL,
+    CASTLE_TOP_MIN_ROW,
+    CASTLE_TOP_MAX_ROW,
+    CASTLE_BOT_MIN_ROW,
+    CASTLE_BOT_MAX_ROW,
+)
+from ..base.camp import Camp
+from ..base.move_table import get_move_paths
+from ..base.piece import PieceType
+from ..game.janggi_game import JanggiGame
+
+# A table is two files, <name>.wdl and <name>.dtm, each a header followed by one value
+# per position index. The header is HEADER_STRUCT, then the signed piece code of every
+# slot of the table, padded to a multiple of 8 bytes. All integers are little-endian.
+TABLE_MAGIC = b"JGTB"
+TABLE_VERSION = 2
+HEADER_STRUCT = struct.Struct("<4sHBB")
+WDL_KIND = 0
+DTM_KIND = 1
+WDL_DTYPE = np.dtype("i1")
+DTM_DTYPE = np.dtype("<u2")
+
+# Results for the side to move.
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+# Letters of the piece types in table names, e.g. "KGRvKG".
+PIECE_LETTERS = {
+    PieceType.GENERAL: "K",
+    PieceType.GUARD: "G",
+    PieceType.HORSE: "H",
+    PieceType.ELEPHANT: "E",
+    PieceType.CHARIOT: "R",
+    PieceType.CANNON: "C",
+    PieceType.SOLDIER: "S",
+}
+_PIECE_TYPE_BY_LETTER = {letter: piece_type for piece_type, letter in PIECE_LETTERS.items()}
+
+# Distance of positions whose result is not known yet.
+_UNREACHED = np.iinfo(np.uint16).max
+# Number of positions whose moves are generated at once.
+_BATCH_SIZE = 1 << 14
+# Positions are stored with camp cho's general on or left of this column.
+_CENTER_COL = (MIN_COL + MAX_COL) // 2
+
+
+class TablebaseEntry(NamedTuple):
+    """
+    Tablebase value of a position.
+
+    Attributes:
+        wdl (int): WIN, DRAW or LOSS for the side to move.
+        dtm (int): Number of plies until the losing side is checkmated or loses its
+          general, with best play from both sides. 0 for draws.
+    """
+    wdl: int
+    dtm: int
+
+
+def material_name(cho_pieces: Sequence[PieceType], han_pieces: Sequence[PieceType]) -> str:
+    """
+    Return the name of the table of a material configuration, e.g. "KGRvKG".
+
+    Args:
+        cho_pieces (Sequence[PieceType]): Pieces of camp cho besides its general.
+        han_pieces (Sequence[PieceType]): Pieces of camp han besides its general.
+
+    Returns:
+        str: Table name; pieces of each camp are ordered by piece type.
+    """
+    return "v".join("K" + "".join(PIECE_LETTERS[piece_type] for piece_type in
+                                  sorted(pieces, key=lambda piece_type: piece_type.value))
+                    for pieces in (cho_pieces, han_pieces))
+
+
+def parse_material(name: str) -> Tuple[List[PieceType], List[PieceType]]:
+    """
+    Parse a table name written by material_name.
+
+    Args:
+        name (str): Table name, e.g. "KGRvKG".
+
+    Raises:
+        Exception: When the name does not describe a material configuration.
+
+    Returns:
+        Tuple[List[PieceType], List[PieceType]]: Pieces of camp cho and camp han
+          besides their generals.
+    """
+    sides = name.split("v")
+    if len(sides) != 2 or not all(side.startswith("K") for side in sides):
+        raise Exception(f"Invalid tablebase material {name}.")
+    try:
+        return tuple([_PIECE_TYPE_BY_LETTER[letter] for letter in side[1:]]
+                     for side in sides)
+    except KeyError:
+        raise Exception(f"Invalid tablebase material {name}.")
+
+
+def placement_squares(piece_type: PieceType, camp: Camp) -> List[int]:
+    """
+    List the squares a piece can stand on with camp cho at the bottom of the board.
+    Generals and guards never leave their palace, and soldiers never move backwards,
+    so they are only placed where play can bring them.
+
+    Args:
+        piece_type (PieceType): Type of the piece.
+        camp (Camp): Camp of the piece.
+
+    Returns:
+        List[int]: Square indices (row * NUM_COLS + col) in row-major order.
+    """
+    if piece_type == PieceType.GENERAL or piece_type == PieceType.GUARD:
+        if camp == Camp.CHO:
+            rows = range(CASTLE_BOT_MIN_ROW, CASTLE_BOT_MAX_ROW + 1)
+        else:
+            rows = range(CASTLE_TOP_MIN_ROW, CASTLE_TOP_MAX_ROW + 1)
+        return [row * NUM_COLS + col for row in rows
+                for col in range(CASTLE_MIN_COL, CASTLE_MAX_COL + 1)]
+    if piece_type == PieceType.SOLDIER:
+        # soldiers of camp cho start on row 6 and move up, camp han's start on row 3
+        if camp == Camp.CHO:
+            return list(range(0, 7 * NUM_COLS))
+        return list(range(3 * NUM_COLS, NUM_SQUARES))
+    return list(range(NUM_SQUARES))
+
+
+def _material_codes(cho_pieces: Sequence[PieceType],
+                    han_pieces: Sequence[PieceType]) -> Tuple[int, ...]:
+    """Return the piece code of every slot: cho's general and pieces, then han's."""
+    codes = []
+    for camp, pieces in ((Camp.CHO, cho_pieces), (Camp.HAN, han_pieces)):
+        codes.append(PieceType.GENERAL.value * camp)
+        codes += sorted((piece_type.value * camp for piece_type in pieces), key=abs)
+    return tuple(codes)
+
+
+def _signature(codes) -> Tuple[int, ...]:
+    return tuple(sorted(code for code in codes if code))
+
+
+def _build_binomials(max_n: int, max_k: int) -> List[List[int]]:
+    binomials = [[0] * (max_k + 1) for _ in range(max_n + 1)]
+    for n in range(max_n + 1):
+        binomials[n][0] = 1
+        for k in range(1, min(n, max_k) + 1):
+            binomials[n][k] = binomials[n - 1][k - 1] + binomials[n - 1][k]
+    return binomials
+
+
+# _BINOMIALS[n][k]: number of ways to pick k of n squares.
+_BINOMIALS = _build_binomials(NUM_SQUARES, 8)
+_BINOMIAL_ARRAY = np.array(_BINOMIALS, dtype=np.int64)
+
+
+def _mirror(squares):
+    """Reflect squares (an int or an array of them) across the center column."""
+    return squares + MAX_COL - 2 * (squares % NUM_COLS)
+
+
+class EndgameTable:
+    """
+    Win/draw/loss and distance-to-mate of every position of one material configuration.
+    Pieces of the same code form a group, and a position is indexed by the placement of
+    the groups, in mixed radix, plus the side to move; camp cho is at the bottom of the
+    board. A single piece is placed by its digit among its placement_squares, and a group
+    of identical pieces by the rank of its sorted digits, so a position is stored once
+    whatever the order of such pieces. Moves are the same left to right, so only
+    positions with camp cho's general on or left of the center column are stored and
+    index() mirrors the others. Indices of placements where two pieces share a square
+    are unused and hold draws.
+    """
+
+    def __init__(self, codes: Sequence[int], wdl: Optional[np.ndarray] = None,
+                 dtm: Optional[np.ndarray] = None):
+        """
+        Initialize endgame table.
+
+        Args:
+            codes (Sequence[int]): Signed piece code of every slot. Camp cho's general
+              must come first, slots of the same code must be next to each other, and
+              each camp must have one general.
+            wdl (Optional[np.ndarray]): WIN, DRAW or LOSS of every index; draws if not given.
+            dtm (Optional[np.ndarray]): Distance to mate of every index; 0 if not given.
+        """
+        self.codes = tuple(codes)
+        # (first slot, number of slots) of every group of identical pieces
+        self.groups: List[Tuple[int, int]] = []
+        for slot, code in enumerate(self.codes):
+            if slot and code == self.codes[slot - 1]:
+                first, count = self.groups[-1]
+                self.groups[-1] = (first, count + 1)
+            else:
+                self.groups.append((slot, 1))
+        self.squares = []
+        for first, _ in self.groups:
+            code = self.codes[first]
+            squares = placement_squares(PieceType(abs(code)), Camp(1 if code > 0 else -1))
+            if first == 0:
+                # the column of camp cho's general decides which mirror image is stored
+                squares = [square for square in squares if square % NUM_COLS <= _CENTER_COL]
+            self.squares.append(squares)
+        self.radices = [_BINOMIALS[len(squares)][count]
+                        for squares, (_, count) in zip(self.squares, self.groups)]
+        self.strides = []
+        self.num_placements = 1
+        for radix in reversed(self.radices):
+            self.strides.insert(0, self.num_placements)
+            self.num_placements *= radix
+        self.size = 2 * self.num_placements
+        self.wdl = wdl if wdl is not None else np.zeros(self.size, dtype=WDL_DTYPE)
+        self.dtm = dtm if dtm is not None else np.zeros(self.size, dtype=DTM_DTYPE)
+        if len(self.wdl) != self.size or len(self.dtm) != self.size:
+            raise Exception(f"Table {self.name} needs {self.size} entries.")
+        # _digits[group][square]: digit of the square in the group's squares, -1 if off-limits
+        self._digits = []
+        # _combinations[group][rank]: sorted digits of the group's pieces at a rank
+        self._combinations = []
+        for squares, (_, count), radix in zip(self.squares, self.groups, self.radices):
+            digits = np.full(NUM_SQUARES, -1, dtype=np.int64)
+            digits[squares] = np.arange(len(squares))
+            self._digits.append(digits)
+            combinations = np.empty((radix, count), dtype=np.int64)
+            for combination in itertools.combinations(range(len(squares)), count):
+                combinations[_rank(combination)] = combination
+            self._combinations.append(combinations)
+        self._square_arrays = [np.array(squares, dtype=np.int64) for squares in self.squares]
+
+    @property
+    def name(self) -> str:
+        """Return the material name of the table (see material_name)."""
+        pieces = ([PieceType(code) for code in self.codes if code > 0],
+                  [PieceType(-code) for code in self.codes if code < 0])
+        return material_name(*([piece_type for piece_type in side
+                                if piece_type != PieceType.GENERAL] for side in pieces))
+
+    @property
+    def signature(self) -> Tuple[int, ...]:
+        """Return the sorted piece codes of the table's material."""
+        return _signature(self.codes)
+
+    def index(self, cells, turn: Camp) -> int:
+        """
+        Return the index of a position of the table's material.
+
+        Args:
+            cells (array): Flat cells of a cho-bottom board holding exactly the table's
+              material (see Board.cells).
+            turn (Camp): Side to move.
+
+        Returns:
+            int: Position index, or -1 if a piece stands outside its placement squares.
+        """
+        squares_by_code = {}
+        for square, code in enumerate(cells):
+            if code:
+                squares_by_code.setdefault(code, []).append(square)
+        is_mirrored = squares_by_code[self.codes[0]][0] % NUM_COLS > _CENTER_COL
+        index = self.num_placements if turn == Camp.HAN else 0
+        for (first, _), digits, stride in zip(self.groups, self._digits, self.strides):
+            group_digits = sorted(int(digits[_mirror(square) if is_mirrored else square])
+                                  for square in squares_by_code[self.codes[first]])
+            if group_digits[0] < 0:
+                return -1
+            index += _rank(group_digits) * stride
+        return index
+
+    def indices(self, squares: np.ndarray, turn: Camp) -> np.ndarray:
+        """
+        Same as index, but for many positions given by the square of every slot.
+
+        Args:
+            squares (np.ndarray): Int array of shape (N, number of slots) holding the
+              square of the piece of every slot on a cho-bottom board.
+            turn (Camp): Side to move in all positions.
+
+        Returns:
+            np.ndarray: Int64 array of shape (N,) of position indices, -1 where a piece
+              stands outside its placement squares.
+        """
+        is_mirrored = squares[:, 0] % NUM_COLS > _CENTER_COL
+        squares = np.where(is_mirrored[:, None], _mirror(squares), squares)
+        indices = np.full(len(squares), self.num_placements if turn == Camp.HAN else 0,
+                          dtype=np.int64)
+        is_valid = np.ones(len(squares), dtype=bool)
+        for (first, count), digits, stride in zip(self.groups, self._digits, self.strides):
+            group_digits = np.sort(digits[squares[:, first:first + count]], axis=1)
+            is_valid &= group_digits[:, 0] >= 0
+            ranks = _BINOMIAL_ARRAY[np.maximum(group_digits, 0),
+                                    np.arange(1, count + 1)].sum(axis=1)
+            indices += ranks * stride
+        indices[~is_valid] = -1
+        return indices
+
+    def decode(self, placements: np.ndarray) -> np.ndarray:
+        """
+        Return the square of every slot of positions, the inverse of indices.
+
+        Args:
+            placements (np.ndarray): Position indices below num_placements, i.e. without
+              the side to move.
+
+        Returns:
+            np.ndarray: Int64 array of shape (N, number of slots). Pieces of a group are
+              in row-major order.
+        """
+        squares = np.empty((len(placements), len(self.codes)), dtype=np.int64)
+        for (first, count), radix, stride, combinations, square_array in zip(
+                self.groups, self.radices, self.strides, self._combinations,
+                self._square_arrays):
+            ranks = placements // stride % radix
+            squares[:, first:first + count] = square_array[combinations[ranks]]
+        return squares
+
+    def probe(self, cells, turn: Camp) -> Optional[TablebaseEntry]:
+        """
+        Look up a position of the table's material.
+
+        Args:
+            cells (array): Flat cells of a cho-bottom board holding exactly the table's
+              material (see Board.cells).
+            turn (Camp): Side to move.
+
+        Returns:
+            Optional[TablebaseEntry]: Value of the position for the side to move, or None
+              if a piece stands outside its placement squares.
+        """
+        index = self.index(cells, turn)
+        if index < 0:
+            return None
+        return TablebaseEntry(int(self.wdl[index]), int(self.dtm[index]))
+
+    @classmethod
+    def load(cls, directory: str, name: str) -> "EndgameTable":
+        """
+        Memory-map the files of a table written by EndgameTable.save.
+
+        Args:
+            directory (str): Directory of the table files.
+            name (str): Material name of the table.
+
+        Raises:
+            Exception: When a file is not a table file of the expected kind or version.
+
+        Returns:
+            EndgameTable: The table.
+        """
+        arrays = []
+        codes = None
+        for kind, dtype in ((WDL_KIND, WDL_DTYPE), (DTM_KIND, DTM_DTYPE)):
+            path = _table_path(directory, name, kind)
+            with open(path, "rb") as table_file:
+                magic, version, file_kind, num_slots = HEADER_STRUCT.unpack(
+                    table_file.read(HEADER_STRUCT.size))
+                if magic != TABLE_MAGIC or file_kind != kind:
+                    raise Exception(f"{path} is not a tablebase file.")
+                if version != TABLE_VERSION:
+                    raise Exception(f"Unsupported tablebase version {version} in {path}.")
+                file_codes = struct.unpack(f"<{num_slots}b", table_file.read(num_slots))
+            if codes is not None and file_codes != codes:
+                raise Exception(f"{path} does not match the material of {name}.")
+            codes = file_codes
+            arrays.append(np.memmap(path, dtype=dtype, mode="r",
+                                    offset=_header_size(num_slots)).view(np.ndarray))
+        return cls(codes, *arrays)
+
+    def save(self, directory: str):
+        """
+        Write the table into <name>.wdl and <name>.dtm files that EndgameTable.load
+        can memory-map.
+
+        Args:
+            directory (str): Directory to write the files in.
+        """
+        header_size = _header_size(len(self.codes))
+        for kind, array_, dtype in ((WDL_KIND, self.wdl, WDL_DTYPE),
+                                    (DTM_KIND, self.dtm, DTM_DTYPE)):
+            header = (HEADER_STRUCT.pack(TABLE_MAGIC, TABLE_VERSION, kind, len(self.codes)) +
+                      struct.pack(f"<{len(self.codes)}b", *self.codes))
+            with open(_table_path(directory, self.name, kind), "wb") as table_file:
+                table_file.write(header.ljust(header_size, b"\0"))
+                table_file.write(np.ascontiguousarray(array_, dtype=dtype).tobytes())
+
+
+def _rank(digits: Sequence[int]) -> int:
+    """Return the rank of sorted distinct digits among all sets of as many digits."""
+    return sum(_BINOMIALS[digit][order + 1] for order, digit in enumerate(digits))
+
+
+def _header_size(num_slots: int) -> int:
+    return (HEADER_STRUCT.size + num_slots + 7) // 8 * 8
+
+
+def _table_path(directory: str, name: str, kind: int) -> str:
+    return os.path.join(directory, name + (".wdl" if kind == WDL_KIND else ".dtm"))
+
+
+def _turn_offset(table: EndgameTable, turn: Camp) -> int:
+    return table.num_placements if turn == Camp.HAN else 0
+
+
+class _MoveTable(NamedTuple):
+    """
+    Moves of the pieces of one code on an empty cho-bottom board, as arrays for
+    generating moves of many positions at once. Moves between the same two squares
+    are kept once.
+
+    Attributes:
+        dests (np.ndarray): dests[origin, k]: destination of the k-th move from origin, or -1.
+        paths (np.ndarray): paths[origin, k, square]: True if the k-th move from origin
+          passes the square.
+        origins (np.ndarray): origins[dest, k]: origin of the k-th move to dest, or -1.
+        origin_paths (np.ndarray): origin_paths[dest, k, square]: True if the k-th move
+          to dest passes the square.
+        move_index (np.ndarray): move_index[origin, dest]: k of the move from origin to
+          dest in dests, or -1.
+    """
+    dests: np.ndarray
+    paths: np.ndarray
+    origins: np.ndarray
+    origin_paths: np.ndarray
+    move_index: np.ndarray
+
+
+_MOVE_TABLES: Dict[int, _MoveTable] = {}
+
+
+def _move_table(code: int) -> _MoveTable:
+    """Return the move arrays of the pieces of a signed code, built on first use."""
+    if code not in _MOVE_TABLES:
+        forward = [{} for _ in range(NUM_SQUARES)]
+        backward = [{} for _ in range(NUM_SQUARES)]
+        for origin in range(NUM_SQUARES):
+            for path, dest in get_move_paths(PieceType(abs(code)), origin, code > 0):
+                forward[origin].setdefault(dest, path)
+                backward[dest].setdefault(origin, path)
+        dests, paths = _pack_moves(forward)
+        origins, origin_paths = _pack_moves(backward)
+        move_index = np.full((NUM_SQUARES, NUM_SQUARES), -1, dtype=np.int64)
+        for origin, origin_dests in enumerate(dests):
+            moves = np.flatnonzero(origin_dests >= 0)
+            move_index[origin, origin_dests[moves]] = moves
+        _MOVE_TABLES[code] = _MoveTable(dests, paths, origins, origin_paths, move_index)
+    return _MOVE_TABLES[code]
+
+
+def _pack_moves(moves: List[Dict[int, Tuple[int, ...]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack the (other end: path) moves of every square into padded arrays."""
+    width = max(len(square_moves) for square_moves in moves)
+    ends = np.full((NUM_SQUARES, width), -1, dtype=np.int64)
+    paths = np.zeros((NUM_SQUARES, width, NUM_SQUARES), dtype=bool)
+    for square, square_moves in enumerate(moves):
+        for move, (end, path) in enumerate(square_moves.items()):
+            ends[square, move] = end
+            paths[square, move, list(path)] = True
+    return ends, paths
+
+
+def _is_open(codes: Tuple[int, ...], squares: np.ndarray, slot: int,
+             passes: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    """
+    Check the path rule of moves of the piece in a slot, given passes(other_squares)
+    telling which moves pass the squares of another slot: no piece may stand in the way,
+    except for cannons, which need exactly one piece to jump that is not a cannon.
+    """
+    num_hurdles = 0
+    passes_cannon = False
+    for other, code in enumerate(codes):
+        if other != slot:
+            passed = passes(squares[:, other])
+            num_hurdles = num_hurdles + passed
+            if abs(code) == PieceType.CANNON.value:
+                passes_cannon = passes_cannon | passed
+    if abs(codes[slot]) == PieceType.CANNON.value:
+        return (num_hurdles == 1) & np.logical_not(passes_cannon)
+    return num_hurdles == 0
+
+
+def _can_capture_general(codes: Tuple[int, ...], squares: np.ndarray,
+                         turn: Camp) -> np.ndarray:
+    """Check for many positions if the side to move can capture the enemy general."""
+    target = squares[:, codes.index(-PieceType.GENERAL.value * turn)]
+    result = np.zeros(len(squares), dtype=bool)
+    for slot, code in enumerate(codes):
+        if code * turn > 0:
+            move_table = _move_table(code)
+            origins = squares[:, slot]
+            moves = move_table.move_index[origins, target]
+            known_moves = np.maximum(moves, 0)
+            result |= (moves >= 0) & _is_open(
+                codes, squares, slot,
+                lambda other_squares: move_table.paths[origins, known_moves, other_squares])
+    return result
+
+
+class TablebaseGenerator:
+    """
+    Generator of endgame tables by retrograde analysis. A first pass generates every
+    move of every position once, for batches of positions at a time, to find checkmates,
+    positions resolved by captures into smaller tables, and the number of quiet moves of
+    every position. Results are then propagated backwards one distance at a time, and
+    the predecessors of newly resolved positions are generated by un-moves, so no move
+    graph is stored: a position with a move into a lost position is won, and a position
+    whose moves all lead into won positions is lost. Positions never resolved are draws.
+    Smaller tables needed for captures are generated first and written to the directory
+    along with the requested table.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Initialize tablebase generator.
+
+        Args:
+            directory (str): Directory to read existing tables from and write new ones to.
+        """
+        self.directory = directory
+        self._tables: Dict[Tuple[int, ...], EndgameTable] = {}
+
+    def generate(self, cho_pieces: Sequence[PieceType],
+                 han_pieces: Sequence[PieceType]) -> EndgameTable:
+        """
+        Generate the table of a material configuration, unless it is already in the
+        directory, along with every table it captures into.
+
+        Args:
+            cho_pieces (Sequence[PieceType]): Pieces of camp cho besides its general.
+            han_pieces (Sequence[PieceType]): Pieces of camp han besides its general.
+
+        Raises:
+            Exception: When a camp is given a general; generals are always included.
+
+        Returns:
+            EndgameTable: The table.
+        """
+        if PieceType.GENERAL in cho_pieces or PieceType.GENERAL in han_pieces:
+            raise Exception("Generals are part of every table and cannot be listed.")
+        codes = _material_codes(cho_pieces, han_pieces)
+        signature = _signature(codes)
+        if signature in self._tables:
+            return self._tables[signature]
+        name = material_name(cho_pieces, han_pieces)
+        if os.path.exists(_table_path(self.directory, name, DTM_KIND)):
+            table = EndgameTable.load(self.directory, name)
+        else:
+            for camp, pieces in ((Camp.CHO, cho_pieces), (Camp.HAN, han_pieces)):
+                for piece_type in set(pieces):
+                    fewer = list(pieces)
+                    fewer.remove(piece_type)
+                    if camp == Camp.CHO:
+                        self.generate(fewer, han_pieces)
+                    else:
+                        self.generate(cho_pieces, fewer)
+            table = self._solve(codes)
+            os.makedirs(self.directory, exist_ok=True)
+            table.save(self.directory)
+        self._tables[signature] = table
+        return table
+
+    def _solve(self, codes: Tuple[int, ...]) -> EndgameTable:
+        table = EndgameTable(codes)
+        size = table.size
+        # positions whose side to move can capture the enemy general: they are won at
+        # once, and no legal move leads into them
+        capturable = np.zeros(size, dtype=bool)
+        # distance at which a position is won, or lost once no quiet move remains
+        win_at = np.full(size, _UNREACHED, dtype=np.uint16)
+        loss_at = np.full(size, _UNREACHED, dtype=np.uint16)
+        # legal moves not yet known to lead into a position the opponent wins
+        remaining = np.zeros(size, dtype=np.int16)
+        # longest distance of the won positions the opponent is led into
+        longest_win = np.full(size, -1, dtype=np.int16)
+
+        for placements, squares in self._valid_placements(table):
+            for turn in (Camp.CHO, Camp.HAN):
+                capturable[_turn_offset(table, turn) + placements] = _can_capture_general(
+                    codes, squares, turn)
+        for placements, squares in self._valid_placements(table):
+            for turn in (Camp.CHO, Camp.HAN):
+                self._count_moves(table, placements, squares, turn, capturable,
+                                  win_at, loss_at, remaining, longest_win)
+        self._propagate(table, capturable, win_at, loss_at, remaining, longest_win)
+        return table
+
+    def _valid_placements(self, table: EndgameTable):
+        """Yield batches of placements where no two pieces share a square, with their squares."""
+        for start in range(0, table.num_placements, _BATCH_SIZE):
+            placements = np.arange(start, min(start + _BATCH_SIZE, table.num_placements))
+            squares = table.decode(placements)
+            sorted_squares = np.sort(squares, axis=1)
+            is_valid = np.all(sorted_squares[:, 1:] != sorted_squares[:, :-1], axis=1)
+            yield placements[is_valid], squares[is_valid]
+
+    def _count_moves(self, table: EndgameTable, placements: np.ndarray, squares: np.ndarray,
+                     turn: Camp, capturable: np.ndarray, win_at: np.ndarray,
+                     loss_at: np.ndarray, remaining: np.ndarray, longest_win: np.ndarray):
+        """Generate the moves of a batch of positions and record what they resolve."""
+        codes = table.codes
+        indices = _turn_offset(table, turn) + placements
+        is_capturable = capturable[indices]
+        win_at[indices[is_capturable]] = 1
+        indices, squares = indices[~is_capturable], squares[~is_capturable]
+        in_check = capturable[_turn_offset(table, turn.opponent) + placements[~is_capturable]]
+
+        num_positions = len(indices)
+        num_unresolved = np.zeros(num_positions, dtype=np.int64)
+        has_move = np.zeros(num_positions, dtype=bool)
+        shortest_win = np.full(num_positions, _UNREACHED, dtype=np.int64)
+        longest = np.full(num_positions, -1, dtype=np.int64)
+        for slot, code in enumerate(codes):
+            if code * turn < 0:
+                continue
+            move_table = _move_table(code)
+            origins = squares[:, slot]
+            dests = move_table.dests[origins]
+            moves = np.arange(dests.shape[1])
+            is_move = (dests >= 0) & _is_open(
+                codes, squares, slot,
+                lambda other_squares: move_table.paths[origins[:, None], moves,
+                                                       other_squares[:, None]])
+            is_capture = np.zeros_like(is_move)
+            captures = []
+            for other, other_code in enumerate(codes):
+                lands = squares[:, other, None] == dests
+                if other_code * turn > 0 or (abs(code) == PieceType.CANNON.value and
+                                             abs(other_code) == PieceType.CANNON.value):
+                    is_move &= ~lands
+                elif abs(other_code) != PieceType.GENERAL.value:
+                    # the enemy general cannot be captured, or the position would be capturable
+                    is_capture |= lands
+                    captures.append((other, lands))
+
+            rows, moves_made = np.nonzero(is_move & ~is_capture)
+            children = squares[rows]
+            children[:, slot] = dests[rows, moves_made]
+            is_legal = ~capturable[table.indices(children, turn.opponent)]
+            num_unresolved += np.bincount(rows[is_legal], minlength=num_positions)
+            has_move[rows[is_legal]] = True
+
+            for other, lands in captures:
+                rows, moves_made = np.nonzero(is_move & lands)
+                children = squares[rows]
+                children[:, slot] = dests[rows, moves_made]
+                children = np.delete(children, other, axis=1)
+                sub_table = self._tables[_signature(codes[:other] + codes[other + 1:])]
+                is_legal = ~_can_capture_general(sub_table.codes, children, turn.opponent)
+                rows, children = rows[is_legal], children[is_legal]
+                has_move[rows] = True
+                entries = sub_table.indices(children, turn.opponent)
+                wdl = sub_table.wdl[entries]
+                dtm = sub_table.dtm[entries].astype(np.int64)
+                np.minimum.at(shortest_win, rows[wdl == LOSS], dtm[wdl == LOSS] + 1)
+                np.maximum.at(longest, rows[wdl == WIN], dtm[wdl == WIN])
+                num_unresolved += np.bincount(rows[wdl == DRAW], minlength=num_positions)
+
+        win_at[indices] = shortest_win
+        remaining[indices] = num_unresolved
+        longest_win[indices] = longest
+        loss_at[indices[~has_move & in_check]] = 0
+        is_lost = has_move & (num_unresolved == 0) & (shortest_win == _UNREACHED)
+        loss_at[indices[is_lost]] = longest[is_lost] + 1
+
+    def _predecessors(self, table: EndgameTable, indices: np.ndarray) -> np.ndarray:
+        """
+        Return every position with a quiet move into one of the given positions, once
+        per such move, by taking back moves of the side that did not move last.
+        """
+        codes = table.codes
+        predecessors = []
+        for turn in (Camp.CHO, Camp.HAN):
+            offset = _turn_offset(table, turn)
+            placements = indices[(indices >= offset) &
+                                 (indices < offset + table.num_placements)] - offset
+            squares = table.decode(placements)
+            general_cols = squares[:, 0] % NUM_COLS
+            for slot, code in enumerate(codes):
+                if code * turn > 0:
+                    continue
+                move_table = _move_table(code)
+                dests = squares[:, slot]
+                origins = move_table.origins[dests]
+                moves = np.arange(origins.shape[1])
+                is_move = (origins >= 0) & _is_open(
+                    codes, squares, slot,
+                    lambda other_squares: move_table.origin_paths[dests[:, None], moves,
+                                                                  other_squares[:, None]])
+                for other in range(len(codes)):
+                    is_move &= squares[:, other, None] != origins
+                rows, moves_taken = np.nonzero(is_move)
+                parents = squares[rows]
+                parents[:, slot] = origins[rows, moves_taken]
+                parent_cols = parents[:, 0] % NUM_COLS
+                predecessors.append(table.indices(parents[parent_cols <= _CENTER_COL],
+                                                  turn.opponent))
+                # the mirror image of a position with camp cho's general left of the center
+                # column is stored as the position itself, so the mirror images of its
+                # predecessors move into it as well
+                is_mirrored = (parent_cols >= _CENTER_COL) & (general_cols[rows] < _CENTER_COL)
+                predecessors.append(table.indices(_mirror(parents[is_mirrored]),
+                                                  turn.opponent))
+        predecessors = np.concatenate(predecessors)
+        return predecessors[predecessors >= 0]
+
+    def _propagate(self, table: EndgameTable, capturable: np.ndarray, win_at: np.ndarray,
+                   loss_at: np.ndarray, remaining: np.ndarray, longest_win: np.ndarray):
+        horizon = max(int(np.max(win_at, where=win_at < _UNREACHED, initial=0)),
+                      int(np.max(loss_at, where=loss_at < _UNREACHED, initial=0)))
+        distance = 0
+        while distance <= horizon:
+            newly = np.flatnonzero(((win_at == distance) | (loss_at == distance)) &
+                                   (table.wdl == DRAW))
+            won = newly[win_at[newly] == distance]
+            lost = newly[win_at[newly] != distance]
+            table.wdl[won] = WIN
+            table.wdl[lost] = LOSS
+            table.dtm[newly] = distance
+
+            # a move into a lost position wins
+            for start in range(0, len(lost), _BATCH_SIZE):
+                winners = self._predecessors(table, lost[start:start + _BATCH_SIZE])
+                winners = winners[table.wdl[winners] == DRAW]
+                win_at[winners] = np.minimum(win_at[winners], distance + 1)
+                if len(winners):
+                    horizon = max(horizon, distance + 1)
+            # a position whose last legal move leads into a won position is lost
+            won = won[~capturable[won]]
+            for start in range(0, len(won), _BATCH_SIZE):
+                losers = self._predecessors(table, won[start:start + _BATCH_SIZE])
+                losers, counts = np.unique(losers[table.wdl[losers] == DRAW],
+                                           return_counts=True)
+                remaining[losers] -= counts.astype(remaining.dtype)
+                longest_win[losers] = np.maximum(longest_win[losers], distance)
+                losers = losers[(remaining[losers] == 0) & (win_at[losers] == _UNREACHED)]
+                loss_at[losers] = longest_win[losers] + 1
+                if len(losers):
+                    horizon = max(horizon, int(loss_at[losers].max()))
+            distance += 1
+
+
+class Tablebase:
+    """
+    Directory of endgame tables for probing during play. Tables are memory-mapped the
+    first time a position of their material is probed, and positions of boards with
+    camp han at the bottom are rotated by 180 degrees to the cho-bottom orientation.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Initialize tablebase from the tables in a directory.
+
+        Args:
+            directory (str): Directory of the table files (see TablebaseGenerator).
+        """
+        self.directory = directory
+        self._names: Dict[Tuple[int, ...], str] = {}
+        self._tables: Dict[Tuple[int, ...], EndgameTable] = {}
+        for file_name in sorted(os.listdir(directory)):
+            name, extension = os.path.splitext(file_name)
+            if extension == ".wdl" and os.path.exists(_table_path(directory, name, DTM_KIND)):
+                self._names[_signature(_material_codes(*parse_material(name)))] = name
+        # largest number of pieces of a table, generals included
+        self.max_pieces = max((len(signature) for signature in self._names), default=0)
+
+    def __len__(self) -> int:
+        """Return the number of tables."""
+        return len(self._names)
+
+    def probe(self, game: JanggiGame) -> Optional[TablebaseEntry]:
+        """
+        Look up the current position of the game.
+
+        Args:
+            game (JanggiGame): Game in the position to look up.
+
+        Returns:
+            Optional[TablebaseEntry]: Value of the position for the side to move, or None
+              if no table covers the position.
+        """
+        return self.probe_cells(game.board.cells, game.turn, game.player)
+
+    def probe_cells(self, cells, turn: Camp,
+                    bottom_camp: Camp = Camp.CHO) -> Optional[TablebaseEntry]:
+        """
+        Look up a position given by its cells.
+
+        Args:
+            cells (array): Flat cells of the board (see Board.cells).
+            turn (Camp): Side to move.
+            bottom_camp (Camp): Camp at the bottom of the board.
+
+        Returns:
+            Optional[TablebaseEntry]: Value of the position for the side to move, or None
+              if no table covers the position.
+        """
+        if NUM_SQUARES - cells.count(0) > self.max_pieces:
+            return None
+        signature = _signature(cells)
+        table = self._tables.get(signature)
+        if table is None:
+            name = self._names.get(signature)
+            if name is None:
+                return None
+            table = self._tables[signature] = EndgameTable.load(self.directory, name)
+        if bottom_camp == Camp.HAN:
+            cells = cells[::-1]
+        return table.probe(cells, turn)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate endgame tablebases.")
+    parser.add_argument("materials", nargs="+", help="material names, e.g. KRvK KGRvKG")
+    parser.add_argument("--out", required=True, help="directory to write the tables in")
+    args = parser.parse_args()
+    generator = TablebaseGenerator(args.out)
+    for material in args.materials:
+        table = generator.generate(*parse_material(material))
+        num_wins = int(np.count_nonzero(table.wdl == WIN))
+        num_losses = int(np.count_nonzero(table.wdl == LOSS))
+        print(f"{table.name}: {table.size} positions, {num_wins} won, {num_losses} lost, "
+              f"longest mate {int(table.dtm.max())} plies")
@@ -0,0 +1,184 @@
+from enum import Enum, IntEnum
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from ..constants import NUM_SQUARES
+
+# Bytes taken by a single entry across all packed arrays.
+ENTRY_BYTES = 8 + 1 + 1 + 1 + 4 + 2
+# Move value stored when an entry has no best move.
+NO_MOVE = -1
+
+
+class Bound(IntEnum):
+    """Enum that represents how a stored score bounds the true score of a position."""
+    NONE = 0
+    EXACT = 1
+    LOWER = 2
+    UPPER = 3
+
+
+class ReplacementPolicy(Enum):
+    """
+    Enum that represents how a full bucket picks the entry to overwrite.
+    DEPTH_PREFERRED keeps deeper results of the current search and drops shallower new ones.
+    ALWAYS_REPLACE always overwrites the shallowest (or oldest) entry of the bucket.
+    """
+    DEPTH_PREFERRED = 1
+    ALWAYS_REPLACE = 2
+
+
+class TTEntry(NamedTuple):
+    """
+    Search result stored for a single position.
+
+    Attributes:
+        depth (int): Remaining search depth the score was computed with.
+        bound (Bound): How score bounds the true score of the position.
+        score (float): Score of the position for the side to move.
+        move (int): Best move as origin_square * NUM_SQUARES + dest_square, or NO_MOVE.
+    """
+    depth: int
+    bound: Bound
+    score: float
+    move: int
+
+
+def encode_move(origin_square: int, dest_square: int) -> int:
+    """Pack a move given as square indices into the integer stored in the table."""
+    return origin_square * NUM_SQUARES + dest_square
+
+
+def decode_move(move: int):
+    """Unpack a stored move into (origin_square, dest_square) square indices."""
+    return divmod(move, NUM_SQUARES)
+
+
+class TranspositionTable:
+    """
+    Fixed-size transposition table that stores search results by position key.
+    Entries live in preallocated packed NumPy arrays sized by a byte budget,
+    grouped into buckets of bucket_size entries indexed by key % num_buckets.
+    """
+
+    def __init__(self, size_bytes: int = 64 * 1024 * 1024, bucket_size: int = 2,
+                 policy: ReplacementPolicy = ReplacementPolicy.DEPTH_PREFERRED):
+        """
+        Initialize transposition table.
+
+        Args:
+            size_bytes (int): Memory budget of the packed arrays in bytes.
+            bucket_size (int): Number of entries that share a bucket.
+            policy (ReplacementPolicy): Policy used to pick the entry to overwrite.
+
+        Raises:
+            Exception: The budget is too small to hold a single bucket.
+        """
+        self.num_buckets = size_bytes // (ENTRY_BYTES * bucket_size)
+        if self.num_buckets < 1:
+            raise Exception(
+                f"{size_bytes} bytes cannot hold a bucket of {bucket_size} entries.")
+        self.bucket_size = bucket_size
+        self.policy = policy
+        num_entries = self.num_buckets * bucket_size
+        self._keys = np.zeros(num_entries, dtype=np.uint64)
+        self._depths = np.zeros(num_entries, dtype=np.int8)
+        self._bounds = np.zeros(num_entries, dtype=np.uint8)
+        self._generations = np.zeros(num_entries, dtype=np.uint8)
+        self._scores = np.zeros(num_entries, dtype=np.float32)
+        self._moves = np.full(num_entries, NO_MOVE, dtype=np.int16)
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+
+    def __len__(self) -> int:
+        """Return the number of entries the table can hold."""
+        return len(self._keys)
+
+    @property
+    def size_bytes(self) -> int:
+        """Return the number of bytes taken by the packed arrays."""
+        return len(self._keys) * ENTRY_BYTES
+
+    def clear(self):
+        """Remove all entries from the table."""
+        self._bounds[:] = Bound.NONE
+        self._moves[:] = NO_MOVE
+        self.generation = 0
+        self.probes = self.hits = 0
+
+    def new_search(self):
+        """Mark entries stored so far as old, so that new searches can replace them first."""
+        self.generation = (self.generation + 1) % 256
+
+    def probe(self, key: int) -> Optional[TTEntry]:
+        """
+        Look up the search result stored for the given position key.
+
+        Args:
+            key (int): 64-bit position key (see JanggiGame.position_key).
+
+        Returns:
+            Optional[TTEntry]: Stored result, or None if the position is not in the table.
+        """
+        self.probes += 1
+        start = (key % self.num_buckets) * self.bucket_size
+        for index in range(start, start + self.bucket_size):
+            if self._bounds[index] != Bound.NONE and int(self._keys[index]) == key:
+                self.hits += 1
+                return TTEntry(int(self._depths[index]), Bound(self._bounds[index]),
+                               float(self._scores[index]), int(self._moves[index]))
+        return None
+
+    def store(self, key: int, depth: int, bound: Bound, score: float, move: int = NO_MOVE):
+        """
+        Store a search result for the given position key, subject to the replacement policy.
+
+        Args:
+            key (int): 64-bit position key (see JanggiGame.position_key).
+            depth (int): Remaining search depth the score was computed with.
+            bound (Bound): How score bounds the true score of the position.
+            score (float): Score of the position for the side to move.
+            move (int): Best move (see encode_move), or NO_MOVE.
+        """
+        start = (key % self.num_buckets) * self.bucket_size
+        victim = None
+        victim_rank = None
+        for index in range(start, start + self.bucket_size):
+            if self._bounds[index] == Bound.NONE:
+                victim = index
+                break
+            if int(self._keys[index]) == key:
+                # keep the known best move when the new result has none
+                if move == NO_MOVE:
+                    move = int(self._moves[index])
+                victim = index
+                break
+            # rank entries so that old generations go first, then shallow depths
+            is_current = self._generations[index] == self.generation
+            rank = (is_current, int(self._depths[index]))
+            if victim_rank is None or rank < victim_rank:
+                victim, victim_rank = index, rank
+
+        if (victim_rank is not None and self.policy == ReplacementPolicy.DEPTH_PREFERRED
+                and victim_rank[0] and depth < victim_rank[1]):
+            return
+
+        self._keys[victim] = key
+        self._depths[victim] = depth
+        self._bounds[victim] = bound
+        self._generations[victim] = self.generation
+        self._scores[victim] = score
+        self._moves[victim] = move
+
+    def hashfull(self) -> float:
+        """
+        Return the fraction of entries used by the current search.
+
+        Returns:
+            float: Number between 0 and 1.
+        """
+        used = (self._bounds != Bound.NONE) & (
+            self._generations == self.generation)
+        return float(np.count_nonzero(used)) / len(self._keys)
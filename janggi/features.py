@@ -0,0 +1,186 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from .constants import HAN_ADVANTAGE
+from .base.camp import Camp
+from .base.piece import PieceType
+from .base.planes import NUM_PLANES, empty_planes
+from .game.action_space import ACTION_INDEX
+from .game.game_log import GameLog
+from .game.janggi_game import JanggiGame
+from .proto import log_pb2
+
+# A game given to the pipeline: a GameLog or a log_pb2.Log message.
+LogLike = Union[GameLog, log_pb2.Log]
+
+
+class FeatureBatch(NamedTuple):
+    """
+    Training tuples of positions, one row per position.
+
+    Attributes:
+        planes (np.ndarray): Encoded positions (see JanggiGame.to_planes),
+          shape (N, 16, NUM_ROWS, NUM_COLS).
+        actions (np.ndarray): Action index of the move played from each position
+          (see action_space.encode_action), shape (N,).
+        outcomes (np.ndarray): Final result of the game for the side to move:
+          1 for a win, -1 for a loss and 0 for a draw, shape (N,).
+        materials (np.ndarray): Material of the side to move minus material of the
+          opponent, as counted by Board.get_score, shape (N,).
+    """
+    planes: np.ndarray
+    actions: np.ndarray
+    outcomes: np.ndarray
+    materials: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+
+def extract_game_features(game_log: LogLike, winner: Optional[Camp] = None,
+                          dtype=np.float32) -> FeatureBatch:
+    """
+    Replay a game and encode every position before a move into a training tuple.
+
+    Args:
+        game_log (LogLike): Game to encode.
+        winner (Optional[Camp]): Winner of the game. If None, the last mover is the winner
+          when the game ended by capturing or checkmating the enemy general, and the game
+          is a draw otherwise.
+        dtype: Data type of the planes.
+
+    Returns:
+        FeatureBatch: One row per move of the game.
+    """
+    if isinstance(game_log, log_pb2.Log):
+        game_log = GameLog.from_proto(game_log)
+    num_moves = len(game_log.move_log)
+    planes = empty_planes(NUM_PLANES, num_moves, dtype)
+    actions = np.empty(num_moves, dtype=np.int16)
+    turns = np.empty(num_moves, dtype=np.int8)
+    materials = np.empty(num_moves, dtype=np.float32)
+
+    game = JanggiGame(game_log.bottom_camp, game_log.cho_formation, game_log.han_formation)
+    captured = None
+    for ply, (origin, dest) in enumerate(game_log.move_log):
+        game.to_planes(planes[ply])
+        actions[ply] = ACTION_INDEX[origin.index, dest.index]
+        turns[ply] = game.turn
+        # han's score includes HAN_ADVANTAGE, which is not material on the board
+        materials[ply] = (game.cho_score - game.han_score + HAN_ADVANTAGE) * game.turn
+        captured = game.make_move(origin, dest).captured
+
+    if winner is None and num_moves:
+        if (captured and captured.piece_type == PieceType.GENERAL) or game.is_checkmate():
+            winner = game.turn.opponent
+    outcomes = (turns * (winner or 0)).astype(np.float32)
+    return FeatureBatch(planes, actions, outcomes, materials)
+
+
+def _extract_chunk(games: List[Tuple[LogLike, Optional[Camp]]], dtype) -> FeatureBatch:
+    """Encode a chunk of games in a worker and concatenate their rows."""
+    return concat_batches([extract_game_features(game_log, winner, dtype)
+                           for game_log, winner in games], dtype)
+
+
+def concat_batches(batches: List[FeatureBatch], dtype=np.float32) -> FeatureBatch:
+    """
+    Concatenate feature batches row-wise.
+
+    Args:
+        batches (List[FeatureBatch]): Batches to concatenate.
+        dtype: Data type of the planes if batches is empty.
+
+    Returns:
+        FeatureBatch: All rows of the batches in order.
+    """
+    if not batches:
+        return FeatureBatch(empty_planes(NUM_PLANES, 0, dtype), np.empty(0, dtype=np.int16),
+                            np.empty(0, dtype=np.float32), np.empty(0, dtype=np.float32))
+    return FeatureBatch(*(np.concatenate(arrays) for arrays in zip(*batches)))
+
+
+class FeaturePipeline:
+    """
+    Pipeline stage that turns games into fixed-size batches of training tuples.
+    Games are read lazily from the input, encoded in chunks by a pool of worker
+    processes, and regrouped into batches of batch_size rows in input order.
+    At most max_pending chunks are in flight, so a slow consumer stalls the reading
+    of games instead of piling up encoded batches in memory.
+    """
+
+    def __init__(self, batch_size: int = 1024, num_workers: Optional[int] = None,
+                 games_per_chunk: int = 32, max_pending: Optional[int] = None,
+                 drop_last: bool = False, dtype=np.float32):
+        """
+        Initialize feature pipeline.
+
+        Args:
+            batch_size (int): Number of rows per batch.
+            num_workers (Optional[int]): Number of worker processes; defaults to the number
+              of CPUs. 0 encodes all games in the calling process.
+            games_per_chunk (int): Number of games per worker task.
+            max_pending (Optional[int]): Number of worker tasks in flight; defaults to
+              twice the number of workers.
+            drop_last (bool): Drop the last batch if it has fewer than batch_size rows.
+            dtype: Data type of the planes.
+        """
+        self.batch_size = batch_size
+        self.num_workers = num_workers if num_workers is not None else os.cpu_count()
+        self.games_per_chunk = games_per_chunk
+        self.max_pending = max_pending or 2 * max(self.num_workers, 1)
+        self.drop_last = drop_last
+        self.dtype = dtype
+
+    def __call__(self, game_logs: Iterable[LogLike],
+                 winners: Optional[Iterable[Optional[Camp]]] = None) -> Iterator[FeatureBatch]:
+        """
+        Encode games into batches.
+
+        Args:
+            game_logs (Iterable[LogLike]): Games to encode; consumed lazily.
+            winners (Optional[Iterable[Optional[Camp]]]): Winner of each game, if known
+              (see extract_game_features).
+
+        Returns:
+            Iterator[FeatureBatch]: Batches of batch_size rows, in input order.
+        """
+        games = zip(game_logs, winners) if winners is not None else (
+            (game_log, None) for game_log in game_logs)
+        chunks = iter(lambda: list(islice(games, self.games_per_chunk)), [])
+        return self._rebatch(self._extract_chunks(chunks))
+
+    def _extract_chunks(self, chunks: Iterator[List]) -> Iterator[FeatureBatch]:
+        if self.num_workers == 0:
+            for chunk in chunks:
+                yield _extract_chunk(chunk, self.dtype)
+            return
+        with ProcessPoolExecutor(self.num_workers) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_extract_chunk, chunk, self.dtype))
+                if len(pending) >= self.max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _rebatch(self, chunk_batches: Iterator[FeatureBatch]) -> Iterator[FeatureBatch]:
+        buffered, num_buffered = [], 0
+        for chunk_batch in chunk_batches:
+            buffered.append(chunk_batch)
+            num_buffered += len(chunk_batch)
+            if num_buffered < self.batch_size:
+                continue
+            rows = concat_batches(buffered, self.dtype)
+            num_full = num_buffered // self.batch_size * self.batch_size
+            for start in range(0, num_full, self.batch_size):
+                yield FeatureBatch(*(array[start:start + self.batch_size] for array in rows))
+            buffered = [FeatureBatch(*(array[num_full:] for array in rows))]
+            num_buffered -= num_full
+        if num_buffered and not self.drop_last:
+            yield concat_batches(buffered, self.dtype)
@@ -0,0 +1,150 @@
+from typing import Dict, Tuple
+
+import numpy as np
+
+from ..constants import NUM_ROWS, NUM_COLS, NUM_SQUARES
+from ..base.location import Location
+
+
+def _generate_move_types():
+    """
+    Generate (row, col) displacements of every move type, grouped like AlphaZero's
+    chess encoding: straight moves by direction and distance, then diagonal moves
+    in the castle, then horse and elephant jumps.
+    """
+    move_types = []
+    # straight moves of chariots, cannons, soldiers and castle pieces
+    for dr, dc in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
+        for distance in range(1, max(NUM_ROWS, NUM_COLS)):
+            move_types.append((dr * distance, dc * distance))
+    # diagonal moves along the castle lines
+    for dr, dc in [(-1, -1), (-1, 1), (1, -1), (1, 1)]:
+        for distance in (1, 2):
+            move_types.append((dr * distance, dc * distance))
+    # horse moves
+    for dr, dc in [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]:
+        move_types.append((dr, dc))
+    # elephant moves
+    for dr, dc in [(-3, -2), (-3, 2), (-2, -3), (-2, 3), (2, -3), (2, 3), (3, -2), (3, 2)]:
+        move_types.append((dr, dc))
+    return move_types
+
+
+# MOVE_TYPES[move_type]: (row, col) displacement of the move type.
+MOVE_TYPES = _generate_move_types()
+MOVE_TYPE_BY_DISPLACEMENT: Dict[Tuple[int, int], int] = {
+    displacement: move_type for move_type, displacement in enumerate(MOVE_TYPES)}
+NUM_MOVE_TYPES = len(MOVE_TYPES)
+
+# An action is origin_square * NUM_MOVE_TYPES + move_type.
+ACTION_SPACE_SIZE = NUM_SQUARES * NUM_MOVE_TYPES
+
+
+def _build_action_tables():
+    action_index = np.full((NUM_SQUARES, NUM_SQUARES), -1, dtype=np.int16)
+    action_origin = np.full(ACTION_SPACE_SIZE, -1, dtype=np.int16)
+    action_dest = np.full(ACTION_SPACE_SIZE, -1, dtype=np.int16)
+    for origin_square in range(NUM_SQUARES):
+        origin_row, origin_col = divmod(origin_square, NUM_COLS)
+        for move_type, (dr, dc) in enumerate(MOVE_TYPES):
+            row, col = (origin_row + dr, origin_col + dc)
+            if not (0 <= row < NUM_ROWS and 0 <= col < NUM_COLS):
+                continue
+            action = origin_square * NUM_MOVE_TYPES + move_type
+            dest_square = row * NUM_COLS + col
+            action_index[origin_square, dest_square] = action
+            action_origin[action] = origin_square
+            action_dest[action] = dest_square
+    for table in (action_index, action_origin, action_dest):
+        table.setflags(write=False)
+    return action_index, action_origin, action_dest
+
+
+def _build_flipped_actions():
+    flipped = np.full(ACTION_SPACE_SIZE, -1, dtype=np.int16)
+    on_board = ACTION_ORIGIN >= 0
+    flipped[on_board] = ACTION_INDEX[NUM_SQUARES - 1 - ACTION_ORIGIN[on_board],
+                                     NUM_SQUARES - 1 - ACTION_DEST[on_board]]
+    flipped.setflags(write=False)
+    return flipped
+
+
+# ACTION_INDEX[origin_square, dest_square]: action of the move, or -1 if no piece moves that way.
+# ACTION_ORIGIN[action], ACTION_DEST[action]: squares of the action, or -1 if it leaves the board.
+ACTION_INDEX, ACTION_ORIGIN, ACTION_DEST = _build_action_tables()
+
+# FLIPPED_ACTION[action]: the same action seen from the other side of the board (see Board.flip).
+FLIPPED_ACTION = _build_flipped_actions()
+
+
+def encode_action(origin: Location, dest: Location) -> int:
+    """
+    Encode a move into its index in the fixed action space.
+
+    Args:
+        origin (Location): Original location of the piece being played.
+        dest (Location): Destination of the piece being played.
+
+    Raises:
+        Exception: When no piece can move from origin to dest.
+
+    Returns:
+        int: Action index between 0 and ACTION_SPACE_SIZE - 1.
+    """
+    return encode_squares(origin.index, dest.index)
+
+
+def decode_action(action: int) -> Tuple[Location, Location]:
+    """
+    Decode an action index into (origin, dest) locations.
+
+    Args:
+        action (int): Action index between 0 and ACTION_SPACE_SIZE - 1.
+
+    Raises:
+        Exception: When the action leaves the board.
+
+    Returns:
+        Tuple[Location, Location]: Move in (origin, dest) format.
+    """
+    origin_square, dest_square = decode_squares(action)
+    return (Location.from_index(origin_square), Location.from_index(dest_square))
+
+
+def encode_squares(origin_square: int, dest_square: int) -> int:
+    """
+    Same as encode_action, but with square indices (row * NUM_COLS + col).
+
+    Args:
+        origin_square (int): Original square of the piece being played.
+        dest_square (int): Destination square of the piece being played.
+
+    Raises:
+        Exception: When no piece can move from origin_square to dest_square.
+
+    Returns:
+        int: Action index between 0 and ACTION_SPACE_SIZE - 1.
+    """
+    action = int(ACTION_INDEX[origin_square, dest_square])
+    if action < 0:
+        raise Exception(
+            f"No piece can move from square {origin_square} to square {dest_square}.")
+    return action
+
+
+def decode_squares(action: int) -> Tuple[int, int]:
+    """
+    Same as decode_action, but returns square indices (row * NUM_COLS + col).
+
+    Args:
+        action (int): Action index between 0 and ACTION_SPACE_SIZE - 1.
+
+    Raises:
+        Exception: When the action is out of range or leaves the board.
+
+    Returns:
+        Tuple[int, int]: (origin_square, dest_square) of the action.
+    """
+    if not 0 <= action < ACTION_SPACE_SIZE or ACTION_ORIGIN[action] < 0:
+        raise Exception(f"The action {action} is not on the board.")
+    return int(ACTION_ORIGIN[action]), int(ACTION_DEST[action])
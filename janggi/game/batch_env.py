@@ -0,0 +1,202 @@
+import random
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from ..constants import NUM_ROWS, NUM_COLS, NUM_SQUARES
+from ..base.camp import Camp
+from ..base.formation import Formation
+from ..base.location import Location
+from ..base.piece import PieceType, PIECE_VALUE, MAX_CODE
+from ..base.planes import (
+    NUM_PIECE_PLANES, NUM_PLANES, TURN_PLANE, REPETITION_PLANE,
+    empty_planes, encode_piece_planes,
+)
+from .action_space import ACTION_SPACE_SIZE, ACTION_ORIGIN, ACTION_DEST
+from .janggi_game import JanggiGame
+
+# Reward of ending the game by capturing or checkmating the general (see JanggiGame.make_action).
+GAME_OVER_REWARD = 100.0
+
+
+def _build_capture_rewards() -> np.ndarray:
+    rewards = np.zeros(2 * MAX_CODE + 1, dtype=np.float32)
+    for piece_type, value in PIECE_VALUE.items():
+        if piece_type == PieceType.GENERAL:
+            value = GAME_OVER_REWARD
+        rewards[MAX_CODE + piece_type.value] = rewards[MAX_CODE - piece_type.value] = value
+    return rewards
+
+
+# CAPTURE_REWARD[code + MAX_CODE]: reward of capturing the piece with the signed code.
+CAPTURE_REWARD = _build_capture_rewards()
+
+
+class BatchJanggiEnv:
+    """
+    Environment that runs a batch of Janggi games in lockstep.
+    Boards, turns, ply counts and legal action masks of all games are kept in stacked
+    NumPy arrays, and a single step call plays one action in every game. Validation,
+    rewards, board updates and done flags are computed on the arrays for all games at
+    once; only move generation for the next positions is left to each JanggiGame.
+    Games that end are reset right away, so every step returns observations of
+    running games.
+    """
+
+    def __init__(self, num_envs: int, player: Optional[Camp] = None,
+                 cho_formation: Optional[Formation] = None,
+                 han_formation: Optional[Formation] = None,
+                 max_plies: int = 400, seed: Optional[int] = None):
+        """
+        Initialize batch environment.
+
+        Args:
+            num_envs (int): Number of games to run.
+            player (Optional[Camp]): Camp of the bottom player; random per game if None.
+            cho_formation (Optional[Formation]): Formation of camp cho; random per game if None.
+            han_formation (Optional[Formation]): Formation of camp han; random per game if None.
+            max_plies (int): Number of plies after which a game is ended as a draw.
+            seed (Optional[int]): Seed of the random choices made on reset.
+        """
+        self.num_envs = num_envs
+        self.player = player
+        self.cho_formation = cho_formation
+        self.han_formation = han_formation
+        self.max_plies = max_plies
+        self.random = random.Random(seed)
+
+        self.games: List[JanggiGame] = [None] * num_envs
+        self.cells = np.zeros((num_envs, NUM_SQUARES), dtype=np.int8)
+        self.turns = np.zeros(num_envs, dtype=np.int8)
+        self.plies = np.zeros(num_envs, dtype=np.int32)
+        self.bottom_camps = np.zeros(num_envs, dtype=np.int8)
+        self.repetitions = np.zeros(num_envs, dtype=np.int32)
+        self._scratch = np.zeros((num_envs, NUM_SQUARES), dtype=np.int8)
+        self._flips = np.zeros(num_envs, dtype=bool)
+        self._legal_masks = np.zeros((num_envs, ACTION_SPACE_SIZE), dtype=bool)
+        self._rows = np.arange(num_envs)
+        self.reset()
+
+    def reset(self) -> np.ndarray:
+        """
+        Start a new game in every environment.
+
+        Returns:
+            np.ndarray: Observations of shape (num_envs, NUM_ROWS, NUM_COLS).
+        """
+        for index in range(self.num_envs):
+            self._reset_game(index)
+        return self.observations()
+
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Play one action in every game and reset games that end.
+        All actions are checked against the stacked legal action masks before any
+        game is changed, so an invalid action leaves every game as it was.
+
+        Args:
+            actions (np.ndarray): Action index per game (see action_space.encode_action).
+
+        Raises:
+            Exception: When the number of actions differs from num_envs, or when
+              an action is invalid for its game.
+
+        Returns:
+            observations (np.ndarray): Boards of shape (num_envs, NUM_ROWS, NUM_COLS)
+              after the step. Games that ended are already reset.
+            rewards (np.ndarray): Value of the piece captured by each action (see
+              JanggiGame.make_action), from the point of view of the player who moved.
+            dones (np.ndarray): True for games that ended with this step.
+        """
+        actions = np.asarray(actions)
+        if len(actions) != self.num_envs:
+            raise Exception(f"Expected {self.num_envs} actions, got {len(actions)}.")
+        in_range = np.clip(actions, 0, ACTION_SPACE_SIZE - 1)
+        legal = (actions == in_range) & self._legal_masks[self._rows, in_range]
+        if not legal.all():
+            index = int(np.argmin(legal))
+            raise Exception(f"The action {actions[index]} is invalid for game {index}.")
+
+        origins = ACTION_ORIGIN[actions]
+        dests = ACTION_DEST[actions]
+        captured = self.cells[self._rows, dests]
+        rewards = CAPTURE_REWARD[captured + MAX_CODE]
+        self.cells[self._rows, dests] = self.cells[self._rows, origins]
+        self.cells[self._rows, origins] = 0
+        np.negative(self.turns, out=self.turns)
+        self.plies += 1
+        dones = (np.abs(captured) == PieceType.GENERAL.value) | (self.plies >= self.max_plies)
+
+        for index, game in enumerate(self.games):
+            game.make_move(Location.from_index(int(origins[index])),
+                           Location.from_index(int(dests[index])))
+            if not dones[index]:
+                self._legal_masks[index] = game.legal_action_mask()
+                self.repetitions[index] = game.repetition_count()
+        # a game without legal moves ends by checkmate or, if not in check, stalemate
+        no_moves = ~dones & ~self._legal_masks.any(axis=1)
+        for index in np.flatnonzero(no_moves):
+            if self.games[index].is_in_check():
+                rewards[index] = GAME_OVER_REWARD
+        dones |= no_moves
+        for index in np.flatnonzero(dones):
+            self._reset_game(index)
+        return self.observations(), rewards, dones
+
+    def observations(self) -> np.ndarray:
+        """
+        Return boards of all games as signed piece codes (see Board.cells).
+
+        Returns:
+            np.ndarray: Copy of the stacked boards of shape (num_envs, NUM_ROWS, NUM_COLS).
+        """
+        return self.cells.reshape(self.num_envs, NUM_ROWS, NUM_COLS).copy()
+
+    def observation_planes(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Encode all games into planes for their current players (see JanggiGame.to_planes).
+        With a preallocated out buffer, no array is allocated.
+
+        Args:
+            out (Optional[np.ndarray]): Array of shape
+              (num_envs, 16, NUM_ROWS, NUM_COLS) to write to.
+
+        Returns:
+            np.ndarray: Array of shape (num_envs, 16, NUM_ROWS, NUM_COLS).
+        """
+        if out is None:
+            out = empty_planes(NUM_PLANES, self.num_envs)
+        np.not_equal(self.turns, self.bottom_camps, out=self._flips)
+        encode_piece_planes(self.cells, self.turns, self._flips,
+                            out[:, :NUM_PIECE_PLANES], self._scratch)
+        np.equal(self.turns[:, None, None], Camp.CHO.value, out=out[:, TURN_PLANE])
+        np.copyto(out[:, REPETITION_PLANE], self.repetitions[:, None, None],
+                  casting="unsafe")
+        return out
+
+    def legal_action_masks(self) -> np.ndarray:
+        """
+        Return legal action masks of all games (see JanggiGame.legal_action_mask).
+
+        Returns:
+            np.ndarray: Boolean array of shape (num_envs, ACTION_SPACE_SIZE).
+        """
+        return self._legal_masks.copy()
+
+    def _reset_game(self, index: int):
+        player = self.player or Camp(self.random.choice([-1, 1]))
+        cho_formation = self.cho_formation or Formation(self.random.randint(1, 4))
+        han_formation = self.han_formation or Formation(self.random.randint(1, 4))
+        self.games[index] = JanggiGame(player, cho_formation, han_formation)
+        self.plies[index] = 0
+        self._sync(index)
+
+    def _sync(self, index: int):
+        """Copy board, turn and legal moves of a game into the stacked arrays."""
+        game = self.games[index]
+        self.cells[index] = np.frombuffer(game.board.cells, dtype=np.int8)
+        self.turns[index] = game.turn
+        self.bottom_camps[index] = game.player
+        self.repetitions[index] = game.repetition_count()
+        self._legal_masks[index] = game.legal_action_mask()
+
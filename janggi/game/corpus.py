@@ -0,0 +1,462 @@
+import os
+import struct
+from array import array
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from ..constants import NUM_SQUARES
+from ..base.board import Board
+from ..base.camp import Camp
+from ..base.formation import Formation
+from ..base.location import Location
+from .game_log import GameLog
+
+# A corpus file is laid out as
+#   header | game record 0 | game record 1 | ... | offset index | footer
+# where the header is CORPUS_MAGIC and CORPUS_VERSION, every game record is a
+# RECORD_HEADER_DTYPE header followed by one (origin, dest) square byte pair per
+# move, the offset index holds the uint64 file offset of every record, and the
+# footer holds the file offset of the index and the number of games.
+# All integers are little-endian.
+CORPUS_MAGIC = b"JGGC"
+CORPUS_VERSION = 1
+HEADER_STRUCT = struct.Struct("<4sHH")
+FOOTER_STRUCT = struct.Struct("<QQ")
+RECORD_HEADER_DTYPE = np.dtype([
+    ("cho_formation", "u1"),
+    ("han_formation", "u1"),
+    ("bottom_camp", "i1"),
+    # Camp that won the game, or 0 for a draw or an unknown result
+    ("winner", "i1"),
+    ("num_moves", "<u4"),
+])
+INDEX_DTYPE = np.dtype("<u8")
+
+
+def encode_moves(moves: List) -> bytes:
+    """
+    Pack moves in (origin, dest) format into square byte pairs (row * NUM_COLS + col).
+
+    Args:
+        moves (List[Tuple[Location, Location]]): Moves of a GameLog.
+
+    Returns:
+        bytes: Two bytes per move.
+    """
+    return bytes([square for origin, dest in moves
+                  for square in (origin.index, dest.index)])
+
+
+def decode_moves(data: Union[bytes, np.ndarray]) -> List:
+    """
+    Unpack square byte pairs written by encode_moves into moves in (origin, dest) format.
+
+    Args:
+        data (Union[bytes, np.ndarray]): Two bytes per move.
+
+    Returns:
+        List[Tuple[Location, Location]]: Moves of a GameLog.
+    """
+    squares = bytes(data)
+    return [(Location.from_index(squares[index]),
+             Location.from_index(squares[index + 1]))
+            for index in range(0, len(squares), 2)]
+
+
+class CorpusWriter:
+    """
+    Streaming writer of a game corpus file. Games are appended one record at a time
+    and the offset index is written on close, so a corpus of any size can be written
+    without keeping its games in memory.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open a new corpus file for writing, replacing any existing file.
+
+        Args:
+            path (str): Path of the corpus file.
+        """
+        self.path = path
+        self._file: BinaryIO = open(path, "wb")
+        self._file.write(HEADER_STRUCT.pack(CORPUS_MAGIC, CORPUS_VERSION, 0))
+        self._offsets = []
+
+    def __enter__(self) -> "CorpusWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        """Return the number of games written so far."""
+        return len(self._offsets)
+
+    def write(self, game_log: GameLog, winner: Optional[Camp] = None):
+        """
+        Append a game to the corpus.
+
+        Args:
+            game_log (GameLog): Game to write.
+            winner (Optional[Camp]): Camp that won the game, or None for a draw or an
+              unknown result.
+        """
+        self._offsets.append(self._file.tell())
+        record_header = np.array([(game_log.cho_formation, game_log.han_formation,
+                                   game_log.bottom_camp, winner or 0,
+                                   len(game_log.move_log))],
+                                 dtype=RECORD_HEADER_DTYPE)
+        self._file.write(record_header.tobytes())
+        self._file.write(encode_moves(game_log.move_log))
+
+    def write_all(self, game_logs: Iterable[GameLog],
+                  winners: Optional[Iterable[Optional[Camp]]] = None):
+        """
+        Append many games to the corpus.
+
+        Args:
+            game_logs (Iterable[GameLog]): Games to write.
+            winners (Optional[Iterable[Optional[Camp]]]): Winner of each game, if known.
+        """
+        if winners is None:
+            for game_log in game_logs:
+                self.write(game_log)
+        else:
+            for game_log, winner in zip(game_logs, winners):
+                self.write(game_log, winner)
+
+    def close(self):
+        """Write the offset index and footer, and close the file."""
+        if self._file.closed:
+            return
+        index_offset = self._file.tell()
+        self._file.write(np.array(self._offsets, dtype=INDEX_DTYPE).tobytes())
+        self._file.write(FOOTER_STRUCT.pack(index_offset, len(self._offsets)))
+        self._file.close()
+
+
+class CorpusReader:
+    """
+    Random-access reader of a game corpus file. The offset index is loaded on open,
+    and each game is read with a single seek and read.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open a corpus file for reading.
+
+        Args:
+            path (str): Path of the corpus file.
+
+        Raises:
+            Exception: When the file is not a corpus file or has an unsupported version.
+        """
+        self.path = path
+        self._file: BinaryIO = open(path, "rb")
+        magic, version, _ = HEADER_STRUCT.unpack(self._file.read(HEADER_STRUCT.size))
+        if magic != CORPUS_MAGIC:
+            self._file.close()
+            raise Exception(f"{path} is not a game corpus file.")
+        if version != CORPUS_VERSION:
+            self._file.close()
+            raise Exception(f"Unsupported corpus version {version} in {path}.")
+        self._file.seek(-FOOTER_STRUCT.size, os.SEEK_END)
+        index_offset, num_games = FOOTER_STRUCT.unpack(self._file.read(FOOTER_STRUCT.size))
+        self._file.seek(index_offset)
+        self.offsets = np.frombuffer(self._file.read(num_games * INDEX_DTYPE.itemsize),
+                                     dtype=INDEX_DTYPE)
+
+    def __enter__(self) -> "CorpusReader":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        """Return the number of games in the corpus."""
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> GameLog:
+        """Read the game at the given index."""
+        return self.read(index)[0]
+
+    def __iter__(self) -> Iterator[GameLog]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def read(self, index: int) -> Tuple[GameLog, Optional[Camp]]:
+        """
+        Read the game at the given index.
+
+        Args:
+            index (int): Index of the game, in the order games were written.
+
+        Raises:
+            IndexError: When the index is out of range.
+
+        Returns:
+            game_log (GameLog): The game.
+            winner (Optional[Camp]): Camp that won the game, or None for a draw or an
+              unknown result.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Game index {index} is out of range.")
+        self._file.seek(int(self.offsets[index]))
+        record_header = np.frombuffer(self._file.read(RECORD_HEADER_DTYPE.itemsize),
+                                      dtype=RECORD_HEADER_DTYPE)[0]
+        moves = decode_moves(self._file.read(2 * int(record_header["num_moves"])))
+        game_log = GameLog(Formation(int(record_header["cho_formation"])),
+                           Formation(int(record_header["han_formation"])),
+                           Camp(int(record_header["bottom_camp"])), moves)
+        winner = int(record_header["winner"])
+        return game_log, Camp(winner) if winner else None
+
+    def close(self):
+        """Close the file."""
+        self._file.close()
+
+
+class PositionBatch(NamedTuple):
+    """
+    Positions sampled from a game corpus by MappedCorpusReader.sample_positions.
+
+    Attributes:
+        games (np.ndarray): Index of the game of each position, shape (N,).
+        plies (np.ndarray): Number of moves played before each position, shape (N,).
+        cells (np.ndarray): Boards as signed piece codes (see Board.cells), shape (N, NUM_SQUARES).
+        moves (np.ndarray): (origin, dest) squares of the move played from each position,
+          shape (N, 2).
+        turns (np.ndarray): Camp to move in each position, shape (N,).
+        bottom_camps (np.ndarray): Bottom camp of the board of each position, shape (N,).
+        winners (np.ndarray): Winner of the game of each position, or 0, shape (N,).
+    """
+    games: np.ndarray
+    plies: np.ndarray
+    cells: np.ndarray
+    moves: np.ndarray
+    turns: np.ndarray
+    bottom_camps: np.ndarray
+    winners: np.ndarray
+
+
+class MappedCorpusReader:
+    """
+    Reader of a game corpus file that memory-maps the file instead of reading it.
+    Record headers and moves are returned as zero-copy NumPy views into the mapping,
+    so games and positions can be accessed at random without parsing the file.
+    Move counts of all games follow from the offset index alone.
+
+    The file stores moves only, so a position is rebuilt by replaying the moves of
+    its game from the initial board: reading the position at a given ply costs
+    O(ply) cell updates, and a sampled batch costs the sum of its plies.
+    """
+
+    def __init__(self, path: str):
+        """
+        Memory-map a corpus file.
+
+        Args:
+            path (str): Path of the corpus file.
+
+        Raises:
+            Exception: When the file is not a corpus file or has an unsupported version.
+        """
+        self.path = path
+        # a plain ndarray view of the memmap keeps the mapping alive without the
+        # per-slice overhead of the memmap subclass
+        self._data = np.memmap(path, dtype=np.uint8, mode="r").view(np.ndarray)
+        magic, version, _ = HEADER_STRUCT.unpack(self._data[:HEADER_STRUCT.size].tobytes())
+        if magic != CORPUS_MAGIC:
+            raise Exception(f"{path} is not a game corpus file.")
+        if version != CORPUS_VERSION:
+            raise Exception(f"Unsupported corpus version {version} in {path}.")
+        index_offset, num_games = FOOTER_STRUCT.unpack(
+            self._data[-FOOTER_STRUCT.size:].tobytes())
+        self.offsets = self._data[index_offset:index_offset +
+                                  num_games * INDEX_DTYPE.itemsize].view(INDEX_DTYPE)
+        record_ends = np.append(self.offsets[1:], np.uint64(index_offset))
+        # num_moves[game]: number of moves of the game
+        self.num_moves = ((record_ends - self.offsets - RECORD_HEADER_DTYPE.itemsize)
+                          // 2).astype(np.int64)
+        # ply_offsets[game]: number of positions in all games before the game
+        self.ply_offsets = np.concatenate(([0], np.cumsum(self.num_moves)))
+        self._initial_cells = {}
+
+    def __enter__(self) -> "MappedCorpusReader":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        """Return the number of games in the corpus."""
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> GameLog:
+        """Parse the game at the given index into a GameLog."""
+        record_header = self.record_header(index)
+        return GameLog(Formation(int(record_header["cho_formation"])),
+                       Formation(int(record_header["han_formation"])),
+                       Camp(int(record_header["bottom_camp"])),
+                       decode_moves(self.moves(index)))
+
+    def __iter__(self) -> Iterator[GameLog]:
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def num_positions(self) -> int:
+        """Return the number of positions (moves played) in all games."""
+        return int(self.ply_offsets[-1])
+
+    def record_header(self, index: int) -> np.void:
+        """
+        Return the record header of the game at the given index (see RECORD_HEADER_DTYPE).
+
+        Args:
+            index (int): Index of the game.
+
+        Returns:
+            np.void: Header with fields cho_formation, han_formation, bottom_camp,
+              winner and num_moves.
+        """
+        offset = int(self.offsets[index])
+        return self._data[offset:offset + RECORD_HEADER_DTYPE.itemsize].view(
+            RECORD_HEADER_DTYPE)[0]
+
+    def moves(self, index: int) -> np.ndarray:
+        """
+        Return the moves of the game at the given index as a zero-copy view.
+
+        Args:
+            index (int): Index of the game.
+
+        Returns:
+            np.ndarray: Read-only uint8 array of shape (num_moves, 2) holding the
+              (origin, dest) squares of every move.
+        """
+        start = int(self.offsets[index]) + RECORD_HEADER_DTYPE.itemsize
+        return self._data[start:start + 2 * int(self.num_moves[index])].reshape(-1, 2)
+
+    def move(self, index: int, ply: int) -> np.ndarray:
+        """
+        Return the (origin, dest) squares of the move played at the given ply of a game.
+
+        Args:
+            index (int): Index of the game.
+            ply (int): Number of moves played before the move.
+
+        Returns:
+            np.ndarray: Read-only uint8 array of shape (2,).
+        """
+        start = int(self.offsets[index]) + RECORD_HEADER_DTYPE.itemsize + 2 * ply
+        return self._data[start:start + 2]
+
+    def position(self, index: int, ply: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Return the board of a game after the given number of moves, as signed piece codes.
+        The moves are replayed on a copy of the initial cells of the game.
+
+        Args:
+            index (int): Index of the game.
+            ply (int): Number of moves to play, from 0 to num_moves[index].
+            out (Optional[np.ndarray]): Int8 array of shape (NUM_SQUARES,) to write to.
+
+        Raises:
+            IndexError: When the ply is out of range.
+
+        Returns:
+            np.ndarray: Int8 array of shape (NUM_SQUARES,) (see Board.cells).
+        """
+        if not 0 <= ply <= self.num_moves[index]:
+            raise IndexError(f"Ply {ply} is out of range for game {index}.")
+        record_header = self.record_header(index)
+        return self._replay(int(record_header["cho_formation"]),
+                            int(record_header["han_formation"]),
+                            int(record_header["bottom_camp"]),
+                            self.moves(index)[:ply], out)
+
+    def sample_positions(self, batch_size: int,
+                         rng: Optional[np.random.Generator] = None) -> PositionBatch:
+        """
+        Sample positions uniformly from all positions of the corpus.
+
+        Args:
+            batch_size (int): Number of positions to sample.
+            rng (Optional[np.random.Generator]): Random number generator to sample with.
+
+        Returns:
+            PositionBatch: Sampled positions, the moves played from them and their games' data.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        position_indices = rng.integers(0, self.num_positions, size=batch_size)
+        games = np.searchsorted(self.ply_offsets, position_indices, side="right") - 1
+        plies = position_indices - self.ply_offsets[games]
+        return self.get_positions(games, plies)
+
+    def get_positions(self, games: np.ndarray, plies: np.ndarray) -> PositionBatch:
+        """
+        Gather positions at the given game and ply indices.
+
+        Args:
+            games (np.ndarray): Index of the game of each position.
+            plies (np.ndarray): Ply of each position, below the game's number of moves.
+
+        Raises:
+            IndexError: When a ply is out of range for its game.
+
+        Returns:
+            PositionBatch: The positions, the moves played from them and their games' data.
+        """
+        games = np.asarray(games, dtype=np.int64)
+        plies = np.asarray(plies, dtype=np.int64)
+        out_of_range = (plies < 0) | (plies >= self.num_moves[games])
+        if out_of_range.any():
+            row = int(np.argmax(out_of_range))
+            raise IndexError(f"Ply {plies[row]} is out of range for game {games[row]}.")
+        record_starts = self.offsets[games].astype(np.int64)
+        header_bytes = self._data[record_starts[:, None] +
+                                  np.arange(RECORD_HEADER_DTYPE.itemsize)]
+        record_headers = header_bytes.view(RECORD_HEADER_DTYPE)[:, 0]
+        move_starts = record_starts + RECORD_HEADER_DTYPE.itemsize + 2 * plies
+        moves = self._data[move_starts[:, None] + np.arange(2)]
+        cells = np.empty((len(games), NUM_SQUARES), dtype=np.int8)
+        for row, (record_header, move_start, ply) in enumerate(
+                zip(record_headers.tolist(), move_starts.tolist(), plies.tolist())):
+            cho_formation, han_formation, bottom_camp, _, _ = record_header
+            self._replay(cho_formation, han_formation, bottom_camp,
+                         self._data[move_start - 2 * ply:move_start].reshape(-1, 2),
+                         cells[row])
+        turns = np.where(plies % 2 == 0, Camp.CHO.value, Camp.HAN.value).astype(np.int8)
+        return PositionBatch(games, plies, cells, moves, turns,
+                             record_headers["bottom_camp"].copy(),
+                             record_headers["winner"].copy())
+
+    def close(self):
+        """Release the memory mapping once no view into it is left."""
+        self._data = None
+        self.offsets = None
+
+    def _replay(self, cho_formation: int, han_formation: int, bottom_camp: int,
+                moves: np.ndarray, out: Optional[np.ndarray]) -> np.ndarray:
+        """Play the given moves from the initial board and write the cells to out."""
+        cells = self._get_initial_cells(cho_formation, han_formation, bottom_camp)[:]
+        for origin, dest in moves.tolist():
+            cells[dest] = cells[origin]
+            cells[origin] = 0
+        if out is None:
+            out = np.empty(NUM_SQUARES, dtype=np.int8)
+        out[:] = np.frombuffer(cells, dtype=np.int8)
+        return out
+
+    def _get_initial_cells(self, cho_formation: int, han_formation: int,
+                           bottom_camp: int) -> array:
+        key = (cho_formation, han_formation, bottom_camp)
+        if key not in self._initial_cells:
+            board = Board.full_board_from_formations(
+                Formation(cho_formation), Formation(han_formation), Camp(bottom_camp))
+            self._initial_cells[key] = board.cells[:]
+        return self._initial_cells[key]
@@ -1,4 +1,5 @@
-from typing import List, Tuple, Optional
+from __future__ import annotations
+from typing import Any, Callable, Iterator, List, Tuple, Optional
 
 from ..base.board import Board
 from ..base.camp import Camp
@@ -6,18 +7,24 @@ from ..base.formation import Formation
 from ..base.location import Location
 from ..proto import log_pb2
 
+# Number of plies between two keyframes kept for seeking (see GameLog.seek).
+KEYFRAME_INTERVAL = 32
+
 
 class GameLog:
     """Simple class that represents list of moves made in a janggi game."""
 
     def __init__(self, cho_formation: Formation, han_formation: Formation,
-                 bottom_camp: Camp, moves: Optional[List[Tuple[Location, Location]]] = []):
+                 bottom_camp: Camp, moves: Optional[List[Tuple[Location, Location]]] = None):
         self.cho_formation = cho_formation
         self.han_formation = han_formation
         self.bottom_camp = bottom_camp
-        self.move_log = moves
+        self.move_log = moves if moves is not None else []
         self.board_log = []
         self.index = 0
+        # _keyframes[k]: board after k * KEYFRAME_INTERVAL moves, built lazily by seek
+        self._keyframes: List[Board] = []
+        self._board: Optional[Board] = None
 
     def add_move(self, move: Tuple[Location, Location]):
         """
@@ -28,13 +35,107 @@ class GameLog:
         """
         self.move_log.append(move)
 
-    def generate_board_log(self):
-        board = Board.full_board_from_formations(
+    def pop_move(self) -> Tuple[Location, Location]:
+        """
+        Remove the last move from the move log and return it.
+
+        Returns:
+            Tuple[Location, Location]: The removed move in (origin, dest) format.
+        """
+        move = self.move_log.pop()
+        # drop keyframes and the seek position that lie beyond the log
+        if self._keyframes and (len(self._keyframes) - 1) * KEYFRAME_INTERVAL > len(self.move_log):
+            self._keyframes.pop()
+        if self._board is not None and self.index > len(self.move_log):
+            self._board = None
+            self.index = 0
+        return move
+
+    def copy(self) -> GameLog:
+        """
+        Return a copy of the log that can grow and shrink on its own. Moves and
+        keyframes are immutable, so they are shared rather than copied.
+
+        Returns:
+            GameLog: Copied log.
+        """
+        copied_log = GameLog(self.cho_formation, self.han_formation, self.bottom_camp,
+                             self.move_log[:])
+        copied_log._keyframes = self._keyframes[:]
+        return copied_log
+
+    def initial_board(self) -> Board:
+        """Return a new board with the initial position of the game."""
+        return Board.full_board_from_formations(
             self.cho_formation, self.han_formation, self.bottom_camp)
-        self.board_log = [board.copy()]
-        for origin, dest in self.move_log:
-            board.move(origin, dest)
-            self.board_log.append(board.copy())
+
+    def iter_positions(self, encoder: Optional[Callable[[Board], Any]] = None,
+                       copy: bool = False) -> Iterator[Any]:
+        """
+        Lazily replay the game and yield the position before every move and the final
+        position, one ply at a time. Only a single board is kept in memory.
+
+        Args:
+            encoder (Optional[Callable[[Board], Any]]): Called with the board of every
+              position to yield its result instead of the board, e.g. Board.to_planes.
+            copy (bool): Yield a copy of the board for every position. By default the same
+              board is yielded and updated in place between positions.
+
+        Returns:
+            Iterator[Any]: Boards, or encoded positions if an encoder is given.
+        """
+        board = self.initial_board()
+        for ply in range(len(self.move_log) + 1):
+            if encoder is not None:
+                yield encoder(board)
+            else:
+                yield board.copy() if copy else board
+            if ply < len(self.move_log):
+                origin, dest = self.move_log[ply]
+                board.move(origin, dest)
+
+    def seek(self, ply: int) -> Board:
+        """
+        Move the replay position to the board after the given number of moves.
+        A board is kept every KEYFRAME_INTERVAL plies, and moves are replayed forward
+        from the current board or the nearest keyframe before the ply.
+
+        Args:
+            ply (int): Number of moves played, from 0 to the number of moves in the log.
+
+        Raises:
+            IndexError: When the ply is out of range.
+
+        Returns:
+            Board: Board of the position. It belongs to the log and changes on the next
+              call of seek, next or prev.
+        """
+        if not 0 <= ply <= len(self.move_log):
+            raise IndexError(f"Ply {ply} is out of range.")
+        if not self._keyframes:
+            self._keyframes.append(self.initial_board())
+
+        if self._board is None or not self.index <= ply < self.index + KEYFRAME_INTERVAL:
+            keyframe_index = min(ply // KEYFRAME_INTERVAL, len(self._keyframes) - 1)
+            self._board = self._keyframes[keyframe_index].copy()
+            self.index = keyframe_index * KEYFRAME_INTERVAL
+
+        while self.index < ply:
+            origin, dest = self.move_log[self.index]
+            self._board.move(origin, dest)
+            self.index += 1
+            if (self.index % KEYFRAME_INTERVAL == 0 and
+                    self.index // KEYFRAME_INTERVAL == len(self._keyframes)):
+                self._keyframes.append(self._board.copy())
+        return self._board
+
+    def generate_board_log(self):
+        """
+        Materialize a copy of the board of every ply into self.board_log.
+        Prefer iter_positions or seek, which do not keep every board in memory.
+        """
+        self.board_log = list(self.iter_positions(copy=True))
+        self._board = None
         self.index = 0
 
     @classmethod
@@ -63,18 +164,42 @@ class GameLog:
             move_proto.dest.CopyFrom(dest.to_proto())
         return log_proto
 
+    @classmethod
+    def from_corpus(cls, path: str) -> List[GameLog]:
+        """
+        Read all games of a game corpus file (see corpus.CorpusReader).
+
+        Args:
+            path (str): Path of the corpus file.
+
+        Returns:
+            List[GameLog]: Games in the order they were written.
+        """
+        from .corpus import CorpusReader  # Imported here to avoid circular import.
+        with CorpusReader(path) as reader:
+            return list(reader)
+
+    @staticmethod
+    def to_corpus(path: str, game_logs: List[GameLog]):
+        """
+        Write games into a new game corpus file (see corpus.CorpusWriter).
+
+        Args:
+            path (str): Path of the corpus file.
+            game_logs (List[GameLog]): Games to write.
+        """
+        from .corpus import CorpusWriter  # Imported here to avoid circular import.
+        with CorpusWriter(path) as writer:
+            writer.write_all(game_logs)
+
     def next(self) -> Board:
-        """Used to access the next board when iterating through self.board_logs."""
-        if self.index >= len(self.board_log) - 1:
+        """Seek to the board after the next move (see GameLog.seek)."""
+        if self._board is not None and self.index >= len(self.move_log):
             raise StopIteration
-        self.index += 1
-        board = self.board_log[self.index]
-        return board
+        return self.seek(self.index + 1 if self._board is not None else 1)
 
     def prev(self) -> Board:
-        """Used to access the previous board when iterating through self.board_logs."""
-        if self.index <= 0:
+        """Seek to the board before the previous move (see GameLog.seek)."""
+        if self._board is None or self.index <= 0:
             raise StopIteration
-        self.index -= 1
-        board = self.board_log[self.index]
-        return board
+        return self.seek(self.index - 1)
@@ -1,15 +1,58 @@
-from typing import List, Tuple
+from __future__ import annotations
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
 
 from ..constants import MIN_ROW, MAX_ROW, MIN_COL, MAX_COL, HAN_ADVANTAGE
 from ..base.board import Board
 from ..base.camp import Camp
 from ..base.formation import Formation
-from ..base.piece import PieceType
+from ..base.piece import Piece, PieceType
 from ..base.location import Location
-from ..base.move import MoveSet
+from ..base.move_table import generate_destinations, is_square_attacked
+from ..base.planes import (
+    NUM_PIECE_PLANES, NUM_PLANES, TURN_PLANE, REPETITION_PLANE, empty_planes,
+)
+from .action_space import ACTION_INDEX, ACTION_SPACE_SIZE
 from .game_log import GameLog
 
 
+class MoveUndo(NamedTuple):
+    """
+    Undo record returned by JanggiGame.make_move and consumed by JanggiGame.unmake_move.
+
+    Attributes:
+        origin (Location): Original location of the piece that was moved.
+        dest (Location): Destination of the piece that was moved.
+        captured (Optional[Piece]): Piece that was captured at dest, or None.
+        turn (Camp): Camp whose turn it was before the move.
+        score_delta (float): Score the captured piece's camp lost by the move.
+    """
+    origin: Location
+    dest: Location
+    captured: Optional[Piece]
+    turn: Camp
+    score_delta: float
+
+
+class GameSnapshot(NamedTuple):
+    """
+    State of a game saved by JanggiGame.snapshot and brought back by JanggiGame.restore.
+
+    Attributes:
+        board (Board): Copy of the board, owned by the snapshot.
+        turn (Camp): Camp whose turn it was.
+        cho_score (float): Score of camp cho.
+        han_score (float): Score of camp han.
+        num_moves (int): Number of moves in the game log.
+    """
+    board: Board
+    turn: Camp
+    cho_score: float
+    han_score: float
+    num_moves: int
+
+
 class JanggiGame:
     """
     A game of Janggi with a game board, players, and scores.
@@ -37,6 +80,14 @@ class JanggiGame:
             cho_formation, han_formation, player)
         self.initial_board = self.board.copy()
         self._update_scores()
+        # number of times each position key has occurred in the game so far
+        self._position_counts: Dict[int, int] = {self.position_key(): 1}
+        # moves of the last position they were generated for, keyed by its position key
+        self._moves_key: Optional[int] = None
+        self._moves: List[Tuple[int, int, int]] = []
+        self._legal_moves_key: Optional[int] = None
+        self._legal_moves: List[Tuple[int, int]] = []
+        self._legal_move_set: Optional[Set[Tuple[int, int]]] = None
 
     def make_action(self, origin: Location, dest: Location) -> Tuple[float, bool]:
         """
@@ -47,10 +98,12 @@ class JanggiGame:
             dest (Location): Destination of the piece to be moved.
 
         Raises:
-            Exception: When the given action is invalid.
+            Exception: When the given action is invalid, including when it would
+              leave the current player's general in check ("Janggun").
 
         Returns:
             piece_value (float): An enemy piece's value if it was killed; 0 otherwise.
+              100 if the action captures or checkmates the enemy general.
             game_over (bool): True if the action ends the game; False otherwise.
         """
         # validate the given action
@@ -58,7 +111,7 @@ class JanggiGame:
             raise Exception("The action cannot be made!")
 
         # make the action
-        piece_removed = self.board.move(origin, dest)
+        piece_removed = self.make_move(origin, dest).captured
 
         # detenmine if game's over
         game_over = False
@@ -69,16 +122,169 @@ class JanggiGame:
                 game_over = True
                 piece_value = 100
 
+        # the game is also over once the enemy general is checkmated
+        if not game_over and self.is_checkmate():
+            game_over = True
+            piece_value = 100
+
+        return float(piece_value), game_over
+
+    def make_move(self, origin: Location, dest: Location) -> MoveUndo:
+        """
+        Move a piece from the given origin location to the given destination without
+        validating the action, and return a record that can take the move back.
+        Scores are updated incrementally, so this is meant for walking a search tree
+        in place with actions from get_all_actions.
+
+        Args:
+            origin (Location): Original location of the piece to be moved.
+            dest (Location): Destination of the piece to be moved.
+
+        Returns:
+            MoveUndo: Undo record to pass to unmake_move.
+        """
+        captured = self.board.move(origin, dest)
+
         # update cho and han's scores
-        self._update_scores()
+        score_delta = 0.0
+        if captured:
+            score_delta = float(captured.value)
+            if captured.camp == Camp.CHO:
+                self.cho_score -= score_delta
+            else:
+                self.han_score -= score_delta
+
+        undo = MoveUndo(origin, dest, captured, self.turn, score_delta)
 
         # switch "turn"
         self.turn = self.turn.opponent
 
         # record move logs
         self.log.add_move((origin, dest))
+        key = self.position_key()
+        self._position_counts[key] = self._position_counts.get(key, 0) + 1
 
-        return float(piece_value), game_over
+        return undo
+
+    def unmake_move(self, undo: MoveUndo):
+        """
+        Take back the last move made by make_move (or make_action).
+
+        Args:
+            undo (MoveUndo): Undo record returned by make_move for the last move.
+        """
+        key = self.position_key()
+        if self._position_counts[key] > 1:
+            self._position_counts[key] -= 1
+        else:
+            del self._position_counts[key]
+        self.board.undo_move(undo.origin, undo.dest, undo.captured)
+        if undo.captured:
+            if undo.captured.camp == Camp.CHO:
+                self.cho_score += undo.score_delta
+            else:
+                self.han_score += undo.score_delta
+        self.turn = undo.turn
+        self.log.pop_move()
+
+    def snapshot(self) -> GameSnapshot:
+        """
+        Save the current state of the game, to come back to with restore after playing
+        moves from it, e.g. for a rollout. Only the board is copied; the move history
+        up to the snapshot stays in the game log.
+
+        Returns:
+            GameSnapshot: Snapshot of the game.
+        """
+        return GameSnapshot(self.board.copy(), self.turn, self.cho_score, self.han_score,
+                            len(self.log.move_log))
+
+    def restore(self, snapshot: GameSnapshot):
+        """
+        Take the game back to a snapshot, dropping every move made since.
+        The same snapshot can be restored any number of times.
+
+        Args:
+            snapshot (GameSnapshot): Snapshot taken by snapshot() on this game.
+
+        Raises:
+            Exception: When moves before the snapshot have been taken back since.
+        """
+        move_log = self.log.move_log
+        if len(move_log) < snapshot.num_moves:
+            raise Exception("The game has been taken back beyond the snapshot.")
+        # replay the dropped moves to take their positions out of the repetition counts
+        board = snapshot.board.copy()
+        turn = snapshot.turn
+        for origin, dest in move_log[snapshot.num_moves:]:
+            board.move_square(origin.index, dest.index)
+            turn = turn.opponent
+            key = board.position_key(turn)
+            if self._position_counts[key] > 1:
+                self._position_counts[key] -= 1
+            else:
+                del self._position_counts[key]
+            self.log.pop_move()
+        self.board = snapshot.board.copy()
+        self.turn = snapshot.turn
+        self.cho_score = snapshot.cho_score
+        self.han_score = snapshot.han_score
+
+    def fork(self) -> JanggiGame:
+        """
+        Return an independent copy of the game in its current state, much cheaper than
+        copy.deepcopy. The initial board, the moves of the log and the cached moves are
+        immutable and shared; the board, the log and the repetition counts are copied.
+
+        Returns:
+            JanggiGame: Copied game.
+        """
+        game = JanggiGame.__new__(JanggiGame)
+        game.__dict__.update(self.__dict__)
+        game.board = self.board.copy()
+        game.log = self.log.copy()
+        game._position_counts = self._position_counts.copy()
+        return game
+
+    def position_key(self) -> int:
+        """
+        Return the 64-bit Zobrist key of the current position, including the side to move.
+
+        Returns:
+            int: Position key that can be used for transposition tables and repetition detection.
+        """
+        return self.board.position_key(self.turn)
+
+    def repetition_count(self) -> int:
+        """
+        Return how many times the current position, including the side to move,
+        occurred earlier in the game.
+
+        Returns:
+            int: 0 if the position is new; more otherwise.
+        """
+        return self._position_counts.get(self.position_key(), 1) - 1
+
+    def to_planes(self, out: Optional[np.ndarray] = None, dtype=np.float32) -> np.ndarray:
+        """
+        Encode the current position into planes for the current player (see
+        Board.to_planes), followed by a side-to-move plane that is all ones when it
+        is camp cho's turn and a repetition plane filled with repetition_count.
+
+        Args:
+            out (Optional[np.ndarray]): Array of shape (16, NUM_ROWS, NUM_COLS)
+              to write to, so that no new array is allocated.
+            dtype: Data type of the new array if out is not given.
+
+        Returns:
+            np.ndarray: Array of shape (16, NUM_ROWS, NUM_COLS).
+        """
+        if out is None:
+            out = empty_planes(NUM_PLANES, dtype=dtype)
+        self.board.to_planes(self.turn, out[:NUM_PIECE_PLANES])
+        out[TURN_PLANE] = self.turn == Camp.CHO
+        out[REPETITION_PLANE] = self.repetition_count()
+        return out
 
     def get_all_actions(self) -> List[Tuple[Location, Location]]:
         """
@@ -88,13 +294,105 @@ class JanggiGame:
             List[Tuple[Location, Location]]: List of moves in (origin, dest) format 
               where it means a piece at origin location being moved to dest location.
         """
-        possible_actions = []
-        piece_locations = self.board.get_piece_locations_for_camp(self.turn)
-        for piece_location in piece_locations:
-            destinations = self.get_all_destinations(piece_location)
-            possible_actions += [(piece_location, dest_location)
-                                 for dest_location in destinations]
-        return possible_actions
+        return [(Location.from_index(origin_square), Location.from_index(dest_square))
+                for origin_square, dest_square, _ in self._get_moves()]
+
+    def generate_moves(self) -> List[Tuple[int, int, int]]:
+        """
+        Generate the moves of get_all_actions, in the same order, on square indices.
+        Destinations are found in one pass per piece (see move_table.generate_destinations),
+        so no Location or MoveSet is involved.
+
+        Returns:
+            List[Tuple[int, int, int]]: Moves in (origin_square, dest_square, captured_code)
+              format, where captured_code is the code of the piece on dest_square (0 if none).
+        """
+        cells = self.board.cells
+        is_player = self.player == self.turn
+        return [(square, dest_square, captured_code)
+                for square in self.board.get_piece_squares(self.turn)
+                for dest_square, captured_code in generate_destinations(cells, square, is_player)]
+
+    def get_legal_actions(self) -> List[Tuple[Location, Location]]:
+        """
+        Get list of all moves that can be made for the current player without leaving
+        its general in check ("Janggun"). Unlike get_all_actions, these are the moves
+        make_action accepts.
+
+        Returns:
+            List[Tuple[Location, Location]]: List of legal moves in (origin, dest) format.
+        """
+        return [(Location.from_index(origin_square), Location.from_index(dest_square))
+                for origin_square, dest_square in self._get_legal_moves()]
+
+    def legal_action_mask(self) -> np.ndarray:
+        """
+        Get legal moves of the current player as a mask over the fixed action space
+        (see action_space.encode_action). Moves are generated on square indices,
+        so no Location is created.
+
+        Returns:
+            np.ndarray: Boolean array of size ACTION_SPACE_SIZE that is True for legal actions.
+        """
+        mask = np.zeros(ACTION_SPACE_SIZE, dtype=bool)
+        moves = self._get_legal_moves()
+        if moves:
+            origins, dests = zip(*moves)
+            mask[ACTION_INDEX[origins, dests]] = True
+        return mask
+
+    def get_legal_destinations(self, origin: Location) -> List[Location]:
+        """
+        List all locations where a piece at given origin can move to without leaving
+        the current player's general in check.
+
+        Args:
+            origin (Location): Location of the piece to get destionations for.
+
+        Returns:
+            List[Location]: List of all legal locations the piece can go to.
+        """
+        self._check_origin(origin)
+        return [Location.from_index(dest_square)
+                for origin_square, dest_square in self._get_legal_moves()
+                if origin_square == origin.index]
+
+    def is_in_check(self, camp: Optional[Camp] = None) -> bool:
+        """
+        Check if the general of the given camp is attacked ("Janggun").
+        Attackers are found by walking outward from the general, without
+        generating the enemy's moves.
+
+        Args:
+            camp (Optional[Camp]): Camp of the general; defaults to the current player.
+
+        Returns:
+            bool: True if the general is in check; False otherwise or if it has been captured.
+        """
+        camp = camp if camp is not None else self.turn
+        square = self.board.get_general_square(camp)
+        if square < 0:
+            return False
+        return is_square_attacked(self.board.cells, square, camp.opponent,
+                                  camp.opponent == self.player)
+
+    def is_checkmate(self) -> bool:
+        """
+        Check if the current player is in check and has no legal move.
+
+        Returns:
+            bool: True if the current player is checkmated; False otherwise.
+        """
+        return self.is_in_check() and not self._has_legal_action()
+
+    def is_stalemate(self) -> bool:
+        """
+        Check if the current player is not in check but has no legal move.
+
+        Returns:
+            bool: True if the current player is stalemated; False otherwise.
+        """
+        return not self.is_in_check() and not self._has_legal_action()
 
     def get_all_destinations(self, origin: Location) -> List[Location]:
         """
@@ -106,10 +404,9 @@ class JanggiGame:
         Returns:
             List[Location]: List of all possible locations the piece can go to.
         """
-        move_sets = self._get_possible_move_sets(origin)
-        all_dest = [ms.get_dest(self.board, origin, self.turn)
-                    for ms in move_sets]
-        return all_dest
+        self._check_origin(origin)
+        return [Location.from_index(dest_square) for dest_square, _ in generate_destinations(
+            self.board.cells, origin.index, self.player == self.turn)]
 
     def _update_scores(self):
         """
@@ -118,19 +415,15 @@ class JanggiGame:
         self.cho_score = self.board.get_score(Camp.CHO)
         self.han_score = self.board.get_score(Camp.HAN) + HAN_ADVANTAGE
 
-    def _get_possible_move_sets(self, origin: Location) -> List[MoveSet]:
+    def _check_origin(self, origin: Location):
         """
-        Get all move sets that pertain to a piece at origin location.
-        In other words, get list of all moves a piece at origin can make, as MoveSet instances.
+        Check that a piece of the current player is at origin location.
 
         Args:
             origin (Location): Location of the piece in question.
 
         Raises:
             Exception: When the given input is invalid.
-
-        Returns:
-            List[MoveSet]: MoveSets that the piece can possibly perform.
         """
         def _is_out_of_bound(location: Location):
             return (location.row < MIN_ROW or location.row > MAX_ROW or
@@ -150,22 +443,62 @@ class JanggiGame:
             raise Exception(
                 f"The piece {piece.piece_type} does not belong to the current player {self.turn}.")
 
-        # Get MoveSets based on piece type
-        if piece.piece_type == PieceType.SOLDIER:
-            move_sets = piece.get_soldier_move_sets(
-                origin, self.player == self.turn)
-        elif piece.piece_type == PieceType.HORSE or piece.piece_type == PieceType.ELEPHANT:
-            move_sets = piece.get_jumpy_move_sets()
-        elif piece.piece_type == PieceType.CHARIOT or piece.piece_type == PieceType.CANNON:
-            move_sets = piece.get_straight_move_sets(origin)
-        elif piece.piece_type == PieceType.GENERAL or piece.piece_type == PieceType.GUARD:
-            move_sets = piece.get_castle_move_sets(
-                origin, self.player == self.turn)
-
-        # Filter out all the invalid move sets
-        move_sets = [ms for ms in move_sets if ms.is_valid(
-            self.board, origin, self.turn)]
-        return move_sets
+    def _generate_legal_moves(self) -> List[Tuple[int, int]]:
+        """
+        Generate the moves of get_legal_actions as (origin_square, dest_square) square indices.
+        """
+        board = self.board
+        cells = board.cells
+        turn = self.turn
+        general = PieceType.GENERAL.value * turn
+        general_square = board.get_general_square(turn)
+        is_opponent_player = turn.opponent == self.player
+        legal_moves = []
+        for origin_square, dest_square, captured_code in self._get_moves():
+            # capturing the enemy general ends the game, so it never counts as self-check
+            if general_square < 0 or captured_code == -general:
+                legal_moves.append((origin_square, dest_square))
+                continue
+            board.move_square(origin_square, dest_square)
+            square = dest_square if cells[dest_square] == general else general_square
+            if not is_square_attacked(cells, square, turn.opponent, is_opponent_player):
+                legal_moves.append((origin_square, dest_square))
+            board.undo_move_square(origin_square, dest_square, captured_code)
+        return legal_moves
+
+    def _has_legal_action(self) -> bool:
+        """Return True if the current player has a legal move."""
+        return bool(self._get_legal_moves())
+
+    def _get_moves(self) -> List[Tuple[int, int, int]]:
+        """
+        Return generate_moves of the current position, generated once per position.
+        The list is shared with the cache and must not be modified.
+        """
+        key = self.position_key()
+        if key != self._moves_key:
+            self._moves = self.generate_moves()
+            self._moves_key = key
+        return self._moves
+
+    def _get_legal_moves(self) -> List[Tuple[int, int]]:
+        """
+        Return _generate_legal_moves of the current position, generated once per position.
+        The list is shared with the cache and must not be modified.
+        """
+        key = self.position_key()
+        if key != self._legal_moves_key:
+            self._legal_moves = self._generate_legal_moves()
+            self._legal_move_set = None
+            self._legal_moves_key = key
+        return self._legal_moves
+
+    def _get_legal_move_set(self) -> Set[Tuple[int, int]]:
+        """Return the legal moves of the current position as a set of square pairs."""
+        legal_moves = self._get_legal_moves()
+        if self._legal_move_set is None:
+            self._legal_move_set = set(legal_moves)
+        return self._legal_move_set
 
     def _validate_action(self, origin: Location, dest: Location) -> bool:
         """
@@ -200,9 +533,6 @@ class JanggiGame:
         if dest_piece and dest_piece.camp == origin_piece.camp:
             return False
 
-        # See if destination is in list of all possible destinatins from origin
-        if dest not in self.get_all_destinations(origin):
-            return False
-
-        # TODO: Invalidate the move makes it enemy's "Janggun"
-        return True
+        # See if the move is a legal move of the current position, which also rules out
+        # moves that leave the player's own general in check ("Janggun")
+        return (origin.index, dest.index) in self._get_legal_move_set()
@@ -0,0 +1,372 @@
+import argparse
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from .base.camp import Camp
+from .base.formation import Formation
+from .base.location import Location
+from .engine.opening_book import OpeningBook
+from .engine.search import AlphaBetaSearch
+from .engine.transposition_table import TranspositionTable
+from .game.corpus import CorpusWriter
+from .game.game_log import GameLog
+from .game.janggi_game import JanggiGame
+
+# A policy picks the move in (origin, dest) format to play in the current position of a game.
+Policy = Callable[[JanggiGame], Tuple[Location, Location]]
+
+
+class RandomPolicy:
+    """Policy that plays a uniformly random legal move."""
+
+    def __init__(self, seed: Optional[int] = None):
+        self.random = random.Random(seed)
+
+    def __call__(self, game: JanggiGame) -> Tuple[Location, Location]:
+        return self.random.choice(game.get_legal_actions())
+
+    def seed(self, seed: Optional[int]):
+        """Reseed the random number generator."""
+        self.random.seed(seed)
+
+
+class EnginePolicy:
+    """
+    Policy that plays the best move found by AlphaBetaSearch.
+    The search and its transposition table are created on first use, so the
+    policy stays cheap to send to worker processes.
+    """
+
+    def __init__(self, max_depth: int = 2, time_limit: Optional[float] = None,
+                 node_limit: Optional[int] = None, tt_size_bytes: int = 4 * 1024 * 1024):
+        """
+        Initialize engine policy.
+
+        Args:
+            max_depth (int): Maximum depth of each search.
+            time_limit (Optional[float]): Time budget of each search in seconds.
+            node_limit (Optional[int]): Node budget of each search.
+            tt_size_bytes (int): Size of the transposition table of the search.
+        """
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.tt_size_bytes = tt_size_bytes
+        self.random = random.Random()
+        self._search = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_search"] = None
+        return state
+
+    def __call__(self, game: JanggiGame) -> Tuple[Location, Location]:
+        if self._search is None:
+            self._search = AlphaBetaSearch(TranspositionTable(self.tt_size_bytes))
+        result = self._search.search(game, self.max_depth, self.time_limit, self.node_limit)
+        # a search stopped by its budget before scoring any move has no move to play
+        if result.move is not None:
+            return result.move
+        return self.random.choice(game.get_legal_actions())
+
+    def seed(self, seed: Optional[int]):
+        """Reseed the random number generator used for fallback moves."""
+        self.random.seed(seed)
+
+
+class BookPolicy:
+    """
+    Policy that plays from an opening book while the position is in it, and falls
+    back to another policy after that. The book is loaded on first use, so only
+    its path is sent to worker processes.
+    """
+
+    def __init__(self, book_path: str, policy: Union[str, Policy] = "random",
+                 temperature: float = 1.0):
+        """
+        Initialize book policy.
+
+        Args:
+            book_path (str): Path of an opening book file (see OpeningBook.save).
+            policy (Union[str, Policy]): Policy used outside the book (see make_policy).
+            temperature (float): Temperature of book move choice (see OpeningBook.choose).
+        """
+        self.book_path = book_path
+        self.policy = make_policy(policy)
+        self.temperature = temperature
+        self.random = random.Random()
+        self._book = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_book"] = None
+        return state
+
+    def __call__(self, game: JanggiGame) -> Tuple[Location, Location]:
+        if self._book is None:
+            self._book = OpeningBook.load(self.book_path)
+        if len(game.log.move_log) < self._book.max_ply:
+            move = self._book.choose(game, self.temperature, rng=self.random)
+            if move is not None:
+                return move
+        return self.policy(game)
+
+    def seed(self, seed: Optional[int]):
+        """Reseed the random number generators of the book and the fallback policy."""
+        self.random.seed(seed)
+        if hasattr(self.policy, "seed"):
+            self.policy.seed(seed)
+
+
+def make_policy(policy: Union[str, Policy]) -> Policy:
+    """
+    Turn a policy name into a policy.
+
+    Args:
+        policy (Union[str, Policy]): "random", "engine", or a policy callable. Callables
+          must be picklable (e.g. defined at module level) to run in worker processes.
+
+    Raises:
+        Exception: When the policy name is unknown.
+
+    Returns:
+        Policy: Policy callable.
+    """
+    if callable(policy):
+        return policy
+    if policy == "random":
+        return RandomPolicy()
+    if policy == "engine":
+        return EnginePolicy()
+    raise Exception(f"Unknown policy {policy}.")
+
+
+class SelfPlayBatch(NamedTuple):
+    """
+    Games finished by a worker in one task.
+
+    Attributes:
+        logs (List[GameLog]): Move logs of the games.
+        winners (List[Optional[Camp]]): Winner of each game, or None for a draw.
+        plies (int): Total number of plies played.
+        elapsed (float): Time the worker took in seconds.
+    """
+    logs: List[GameLog]
+    winners: List[Optional[Camp]]
+    plies: int
+    elapsed: float
+
+
+class SelfPlayStats:
+    """Aggregate counts and throughput of a self-play run."""
+
+    def __init__(self):
+        self.games = 0
+        self.plies = 0
+        self.cho_wins = 0
+        self.han_wins = 0
+        self.draws = 0
+        self.worker_time = 0.0
+        self.start_time = time.perf_counter()
+        self.elapsed = 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.games} games ({self.cho_wins} cho / {self.han_wins} han / "
+                f"{self.draws} draws), {self.plies} plies in {self.elapsed:.2f}s: "
+                f"{self.games_per_sec:.1f} games/s, {self.plies_per_sec:.0f} plies/s")
+
+    @property
+    def games_per_sec(self) -> float:
+        """Return the number of games finished per wall-clock second."""
+        return self.games / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def plies_per_sec(self) -> float:
+        """Return the number of plies played per wall-clock second."""
+        return self.plies / self.elapsed if self.elapsed > 0 else 0.0
+
+    def add(self, batch: SelfPlayBatch):
+        """Count the games of a finished batch."""
+        self.games += len(batch.logs)
+        self.plies += batch.plies
+        self.cho_wins += batch.winners.count(Camp.CHO)
+        self.han_wins += batch.winners.count(Camp.HAN)
+        self.draws += batch.winners.count(None)
+        self.worker_time += batch.elapsed
+        self.elapsed = time.perf_counter() - self.start_time
+
+
+def play_game(cho_policy: Policy, han_policy: Policy, player: Camp,
+              cho_formation: Formation, han_formation: Formation,
+              max_plies: int = 400) -> Tuple[GameLog, Optional[Camp]]:
+    """
+    Play a single game from the initial position to the end.
+
+    Args:
+        cho_policy (Policy): Policy of camp cho.
+        han_policy (Policy): Policy of camp han.
+        player (Camp): Camp of the bottom player.
+        cho_formation (Formation): Formation of camp cho.
+        han_formation (Formation): Formation of camp han.
+        max_plies (int): Number of plies after which the game is a draw.
+
+    Returns:
+        game_log (GameLog): Move log of the game.
+        winner (Optional[Camp]): Camp that captured or checkmated the enemy general,
+          or None if the game ended in a draw (stalemate or max_plies).
+    """
+    game = JanggiGame(player, cho_formation, han_formation)
+    for _ in range(max_plies):
+        if game.is_stalemate():
+            break
+        policy = cho_policy if game.turn == Camp.CHO else han_policy
+        origin, dest = policy(game)
+        mover = game.turn
+        _, game_over = game.make_action(origin, dest)
+        if game_over:
+            return game.log, mover
+    return game.log, None
+
+
+def _play_batch(cho_policy: Policy, han_policy: Policy, num_games: int,
+                max_plies: int, seed: Optional[int]) -> SelfPlayBatch:
+    """Play a batch of games with random camps and formations in a worker."""
+    start_time = time.perf_counter()
+    rng = random.Random(seed)
+    for policy in {id(cho_policy): cho_policy, id(han_policy): han_policy}.values():
+        if hasattr(policy, "seed"):
+            policy.seed(rng.randrange(1 << 32))
+    logs, winners, plies = [], [], 0
+    for _ in range(num_games):
+        player = Camp(rng.choice([-1, 1]))
+        cho_formation = Formation(rng.randint(1, 4))
+        han_formation = Formation(rng.randint(1, 4))
+        log, winner = play_game(cho_policy, han_policy, player,
+                                cho_formation, han_formation, max_plies)
+        logs.append(log)
+        winners.append(winner)
+        plies += len(log.move_log)
+    return SelfPlayBatch(logs, winners, plies, time.perf_counter() - start_time)
+
+
+class SelfPlay:
+    """
+    Self-play game generator that plays games in a pool of worker processes.
+    Each worker task plays batch_size games and sends their logs back as one
+    SelfPlayBatch, and batches are yielded in the order they finish.
+    """
+
+    def __init__(self, policy: Union[str, Policy] = "random",
+                 han_policy: Optional[Union[str, Policy]] = None,
+                 num_workers: Optional[int] = None, batch_size: int = 16,
+                 max_plies: int = 400, seed: Optional[int] = None):
+        """
+        Initialize self-play generator.
+
+        Args:
+            policy (Union[str, Policy]): Policy of camp cho, and of camp han if han_policy
+              is not given (see make_policy).
+            han_policy (Optional[Union[str, Policy]]): Policy of camp han.
+            num_workers (Optional[int]): Number of worker processes; defaults to the number
+              of CPUs. 0 plays all games in the calling process.
+            batch_size (int): Number of games per worker task.
+            max_plies (int): Number of plies after which a game is a draw.
+            seed (Optional[int]): Seed of camps, formations and policies; tasks are seeded
+              by their index, so results do not depend on the number of workers.
+        """
+        self.cho_policy = make_policy(policy)
+        self.han_policy = (make_policy(han_policy) if han_policy is not None
+                           else self.cho_policy)
+        self.num_workers = num_workers if num_workers is not None else os.cpu_count()
+        self.batch_size = batch_size
+        self.max_plies = max_plies
+        self.seed = seed
+        self.stats = SelfPlayStats()
+
+    def generate(self, num_games: int) -> Iterator[SelfPlayBatch]:
+        """
+        Play num_games games and yield them in batches as workers finish them.
+        At most two tasks per worker are in flight, so finished logs do not pile up
+        while the caller is busy with earlier batches.
+
+        Args:
+            num_games (int): Number of games to play.
+
+        Returns:
+            Iterator[SelfPlayBatch]: Finished batches; self.stats is updated before each
+              batch is yielded.
+        """
+        self.stats = SelfPlayStats()
+        task_sizes = [min(self.batch_size, num_games - start)
+                      for start in range(0, num_games, self.batch_size)]
+        base_seed = self.seed if self.seed is not None else random.randrange(1 << 32)
+        task_args = [(self.cho_policy, self.han_policy, size, self.max_plies,
+                      base_seed + index) for index, size in enumerate(task_sizes)]
+
+        if self.num_workers == 0:
+            for args in task_args:
+                batch = _play_batch(*args)
+                self.stats.add(batch)
+                yield batch
+            return
+
+        with ProcessPoolExecutor(self.num_workers) as executor:
+            pending = set()
+            next_task = 0
+            while next_task < len(task_args) or pending:
+                while next_task < len(task_args) and len(pending) < 2 * self.num_workers:
+                    pending.add(executor.submit(_play_batch, *task_args[next_task]))
+                    next_task += 1
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = future.result()
+                    self.stats.add(batch)
+                    yield batch
+
+    def run(self, num_games: int,
+            callback: Optional[Callable[[SelfPlayBatch], None]] = None) -> SelfPlayStats:
+        """
+        Play num_games games and return aggregate stats.
+
+        Args:
+            num_games (int): Number of games to play.
+            callback (Optional[Callable[[SelfPlayBatch], None]]): Called with every
+              finished batch, e.g. to save the logs.
+
+        Returns:
+            SelfPlayStats: Counts and throughput of the run.
+        """
+        for batch in self.generate(num_games):
+            if callback is not None:
+                callback(batch)
+        return self.stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate Janggi games by self-play.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-plies", type=int, default=400)
+    parser.add_argument("--policy", choices=["random", "engine"], default="random")
+    parser.add_argument("--han-policy", choices=["random", "engine"], default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", default=None, help="path of a game corpus file to write")
+    parser.add_argument("--book", default=None, help="path of an opening book to open with")
+    args = parser.parse_args()
+    policy = BookPolicy(args.book, args.policy) if args.book else args.policy
+    han_policy = args.han_policy
+    if args.book and han_policy:
+        han_policy = BookPolicy(args.book, han_policy)
+    self_play = SelfPlay(policy, han_policy, args.workers, args.batch_size,
+                         args.max_plies, args.seed)
+    writer = CorpusWriter(args.out) if args.out else None
+    for batch in self_play.generate(args.games):
+        if writer is not None:
+            writer.write_all(batch.logs, batch.winners)
+        print(self_play.stats)
+    if writer is not None:
+        writer.close()
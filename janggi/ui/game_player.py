@@ -1,10 +1,11 @@
 import logging
 import pygame
 from pygame.locals import *
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from ..base.location import Location
 from ..constants import MIN_ROW, MAX_ROW, MIN_COL, MAX_COL
+from ..engine.opening_book import OpeningBook
 from ..game.janggi_game import JanggiGame
 from .game_window import (
     GameWindow,
@@ -21,10 +22,15 @@ class MoveSelection:
 
 
 class GamePlayer:
-    """Class used to play the game."""
+    """
+    Class used to play the game.
+    With an opening book, pressing B logs the book moves of the current position
+    and selects the piece of the most played one.
+    """
 
-    def __init__(self, game: JanggiGame):
+    def __init__(self, game: JanggiGame, book: Optional[OpeningBook] = None):
         self.game = game
+        self.book = book
         self.window = GameWindow(game.board)
         self.move_selection = None
 
@@ -40,6 +46,9 @@ class GamePlayer:
                 if event.key == K_ESCAPE:
                     self.window.close()
                     return
+                if event.key == K_b and self.book is not None:
+                    self._show_book_moves()
+                    self.window.render()
             if event.type == MOUSEBUTTONUP and event.button == 1:  # left click
                 mousex, mousey = pygame.mouse.get_pos()
                 row, col, success = self._get_board_row_col(mousex, mousey)
@@ -74,7 +83,7 @@ class GamePlayer:
         return game_over
 
     def _set_selection(self, row: int, col: int):
-        dest = self.game.get_all_destinations(Location(row, col))
+        dest = self.game.get_legal_destinations(Location(row, col))
         self.move_selection = MoveSelection(Location(row, col), dest)
         self.window.board_markers = [
             BoardMarker(
@@ -83,6 +92,19 @@ class GamePlayer:
             ) for dest_row, dest_col in dest
         ]
 
+    def _show_book_moves(self):
+        book_moves = self.book.probe(self.game)
+        if not book_moves:
+            logging.info("Position is not in the opening book.")
+            return
+        for book_move in book_moves:
+            logging.info(f"Book move {book_move.origin}->{book_move.dest}: "
+                         f"{book_move.count} games, score {book_move.score:.2f}")
+        book_move = self.book.choose(self.game)
+        if book_move is not None:
+            origin, _ = book_move
+            self._set_selection(origin.row, origin.col)
+
     def _clear_selection(self):
         self.move_selection = []
         self.window.board_markers = []
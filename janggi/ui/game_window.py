@@ -1,6 +1,5 @@
 import logging
 import os
-import pkg_resources
 import pygame
 from typing import List, Optional
 
@@ -16,7 +15,7 @@ BOARD_WIDTH, BOARD_HEIGHT = 500, 500
 PIECE_WIDTH, PIECE_HEIGHT = 40, 40
 BOARD_Y, BOARD_X = 10, 10
 ROW_GAP, COL_GAP = 50, 55
-IMG_PATH = "images/"
+IMG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
 BOARD_FILENAME = "board.png"
 
 
@@ -77,8 +76,7 @@ class GameWindow:
 
     def _initialize_board_image(self):
         board_path = os.path.join(IMG_PATH, BOARD_FILENAME)
-        board_file = pkg_resources.resource_filename(__name__, board_path)
-        board_img = pygame.image.load(board_file)
+        board_img = pygame.image.load(board_path)
         self.board_img = pygame.transform.scale(
             board_img, (BOARD_WIDTH, BOARD_HEIGHT))
 
@@ -88,9 +86,7 @@ class GameWindow:
                 continue
             for piece_type in PieceType:
                 piece_path = self._get_image_path(camp, piece_type)
-                piece_file = pkg_resources.resource_filename(
-                    __name__, piece_path)
-                piece_img = pygame.image.load(piece_file)
+                piece_img = pygame.image.load(piece_path)
                 self.piece_imgs[camp][piece_type] = pygame.transform.scale(
                     piece_img, (PIECE_WIDTH, PIECE_HEIGHT))
 
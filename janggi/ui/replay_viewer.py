@@ -10,7 +10,7 @@ class ReplayViewer:
     """Display replay of a single game using GameWindow."""
 
     def __init__(self, game_log: GameLog):
-        self.window = GameWindow(game_log.board_log[0])
+        self.window = GameWindow(game_log.seek(0))
         self.game_log = game_log
 
     def run(self):
@@ -1,16 +1,22 @@
+from __future__ import annotations
 import logging
 import random
+from typing import TYPE_CHECKING, Optional
 
 from .base.camp import Camp
 from .base.formation import Formation
 from .game.janggi_game import JanggiGame
 from .game.game_log import GameLog
-from .ui.game_player import GamePlayer
-from .ui.replay_viewer import ReplayViewer
 from .proto import log_pb2
 
-logging.basicConfig()
-logging.root.setLevel(logging.DEBUG)
+if TYPE_CHECKING:
+    from .engine.opening_book import OpeningBook
+
+
+def _configure_logging():
+    # Only the interactive entry points log to stderr; importing the package must not.
+    logging.basicConfig()
+    logging.root.setLevel(logging.DEBUG)
 
 
 def replay(filepath: str):
@@ -20,23 +26,29 @@ def replay(filepath: str):
     Args:
         filepath (str): Path of the proto-serialized log file.
     """
+    from .ui.replay_viewer import ReplayViewer
+
+    _configure_logging()
     log_file = open(filepath, "rb")
     log_proto = log_pb2.Log()
     log_proto.ParseFromString(log_file.read())
     game_log = GameLog.from_proto(log_proto)
-    game_log.generate_board_log()
     replay_viewer = ReplayViewer(game_log)
     replay_viewer.run()
 
 
-def play(game: JanggiGame):
+def play(game: JanggiGame, book: Optional[OpeningBook] = None):
     """
     Play a game by running GamePlayer.
 
     Args:
         game (JanggiGame): Pre-initialized game to play.
+        book (Optional[OpeningBook]): Opening book to look up moves in.
     """
-    player = GamePlayer(game)
+    from .ui.game_player import GamePlayer
+
+    _configure_logging()
+    player = GamePlayer(game, book)
     player.run()
 
 
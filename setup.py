@@ -17,9 +17,13 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    packages=["janggi", "janggi/base",
+    packages=["janggi", "janggi/base", "janggi/engine",
               "janggi/game", "janggi/ui", "janggi/proto"],
     include_package_data=True,
-    python_requires=">=3.6",
-    install_requires=["termcolor==1.1.0", "pygame==2.1.2"],
+    python_requires=">=3.7",
+    install_requires=["numpy", "protobuf"],
+    extras_require={
+        "ui": ["pygame==2.1.2"],
+        "color": ["termcolor==1.1.0"],
+    },
 )